@@ -1,74 +1,35 @@
-from typing import List
+import numpy as np
 
-import helpers
+from intcode import IntCodeMachine, Policy, parse_instructions
+from intcode.lanes import LaneMachine
 
 
-class IntCodeMachine:
-    symb = {1: "add", 2: "mul", 99: "hlt"}
-
-    def __init__(self, instructions: List[int], noun=None, verb=None):
-        self.pointer = 0
-        self.memory = list(instructions)
-
-        self.memory[1] = self.memory[1] if noun is None else noun
-        self.memory[2] = self.memory[2] if verb is None else verb
-
-    def get_result(self, step=4):
-        for _ in range(0, len(self.memory), step):
-            result = self.op_codes(step)
-            if result:
-                return result
-            self.pointer += step
-
-    def op_codes(self, step, debug=False):
-
-        op, *args = self.memory[self.pointer : self.pointer + step]
-        if op == 99:
-            """Halt: Exit Now..."""
-            return self.memory[0]
-
-        else:
-            # dereference the two address values
-            value_a = self.memory[args[0]]
-            value_b = self.memory[args[1]]
-
-            if op == 1:  # add
-                self.memory[args[2]] = value_a + value_b
-
-            elif op == 2:  # mult
-                self.memory[args[2]] = value_a * value_b
-
-            else:
-                raise RuntimeError(f"Expected, 1, 2, or 99, but received {op}")
-
-        if debug:
-            self.pprint_debug(args, op, value_a, value_b)
-
-    def pprint_debug(self, args, op, value_a, value_b):
-        print(
-            f"{op:03}, {args[0]:03}, {args[1]:03}, {args[2]:03} | "
-            f"{args[2]:>3} => {self.symb[op]:>4}({value_a}, {value_b}) = {self.memory[args[2]]}"
-        )
-
-
-def parse_instructions(path):
-    lines = helpers.get_lines(path)
-    return [int(v) for v in lines[0].split(",")]
+def get_result(instructions, noun=None, verb=None):
+    m = IntCodeMachine(
+        instructions, noun=noun, verb=verb, silent=True, policy=Policy.RUN_TO_HALT
+    )
+    m.op_codes()
+    return m.memory[0]
 
 
 def brute_force_haystack(instructions, needle):
-    for noun in range(100):
-        for verb in range(100):
+    # every (noun, verb) pair is one lane of a single batched run
+    nouns, verbs = np.divmod(np.arange(100 * 100), 100)
+    m = LaneMachine(instructions, lanes=100 * 100)
+    m.memory[:, 1] = nouns
+    m.memory[:, 2] = verbs
+    m.run()
 
-            m = IntCodeMachine(instructions, noun, verb)
-            p = m.get_result()
-            if p == needle:
-                return 100 * noun + verb
+    for lane in np.flatnonzero(m.memory[:, 0] == needle):
+        noun, verb = divmod(int(lane), 100)
+        # lanes wrap at 64 bits; the scalar machine has the final say
+        if get_result(instructions, noun=noun, verb=verb) == needle:
+            return 100 * noun + verb
 
 
 def run():
     instructions = parse_instructions(r"./data/day_02.txt")
-    part_01 = IntCodeMachine(instructions, noun=12, verb=2).get_result()
+    part_01 = get_result(instructions, noun=12, verb=2)
     part_02 = brute_force_haystack(instructions, 19690720)
 
     assert part_01 == 5866663
@@ -78,7 +39,7 @@ def run():
 def run_local():
     # m = Machine(None, None, r'./data/day_02_test.txt')
     instructions = parse_instructions(r"./data/day_02.txt")
-    part_01 = IntCodeMachine(instructions, noun=12, verb=2).get_result()
+    part_01 = get_result(instructions, noun=12, verb=2)
     part_02 = brute_force_haystack(instructions, 19690720)
     print(f"Part01: {part_01}")
     print(f"Part02: {part_02}")
@@ -5,15 +5,66 @@ The value is within the range given in your puzzle input.
 Two adjacent digits are the same (like 22 in 122345).
 Going from left to right, the digits never decrease; they only ever increase or stay the same (like 111123 or 135679).
 """
-from collections import Counter
-from typing import Iterator, List, ValuesView
+from collections import Counter, defaultdict
+from typing import Dict, Iterator, List, Optional, Tuple, ValuesView
 
+# (started, last digit, length of the last digit's run capped at 3, any repeat, a run of exactly 2)
+State = Tuple[bool, int, int, bool, bool]
 
-def run() -> None:
-    # puzzle_input
-    a: int = 172930
-    b: int = 683082
 
+def step(state: State, digit: int) -> Optional[State]:
+    """The state after appending digit, or None once the digits decrease."""
+    started, last, run, repeat, pair = state
+    if not started:
+        # leading zeros, for the numbers shorter than the bound
+        return state if digit == 0 else (True, digit, 1, False, False)
+    if digit < last:
+        return None
+    if digit == last:
+        return True, digit, min(run + 1, 3), True, pair
+    return True, digit, 1, repeat, pair or run == 2
+
+
+def count_up_to(high: int) -> Tuple[int, int]:
+    """
+    Digit DP over 1..high: how many never decrease and have any repeat (counter1), and
+    how many never decrease and have a run of exactly two (counter2).  `free` holds the
+    prefixes already below high's, with their counts; `tight` is high's own prefix.
+    """
+    free: Dict[State, int] = defaultdict(int)
+    tight: Optional[State] = (False, 0, 0, False, False)
+
+    for top in (int(c) for c in str(high)):
+        following: Dict[State, int] = defaultdict(int)
+        for state, count in free.items():
+            for digit in range(10):
+                if (new := step(state, digit)) is not None:
+                    following[new] += count
+        if tight is not None:
+            for digit in range(top):
+                if (new := step(tight, digit)) is not None:
+                    following[new] += 1
+            tight = step(tight, top)
+        free = following
+
+    if tight is not None:
+        free[tight] += 1
+
+    counter1 = counter2 = 0
+    for (started, _, run, repeat, pair), count in free.items():
+        if started:
+            counter1 += count * repeat
+            counter2 += count * (pair or run == 2)
+    return counter1, counter2
+
+
+def count_passwords(low: int, high: int) -> Tuple[int, int]:
+    """Both counters over low..high inclusive, for any range and number of digits."""
+    upper, lower = count_up_to(high), count_up_to(max(low - 1, 0))
+    return upper[0] - lower[0], upper[1] - lower[1]
+
+
+def brute_force(a: int, b: int) -> Tuple[int, int]:
     # Can't get around having to convert to a  list of characters for each item -- so doing it
     # all at once up front
     ii: Iterator[List[chr]] = (list(str(n)) for n in range(a, b))
@@ -26,9 +77,33 @@ def run() -> None:
             counter1 += 2 <= max(c)
             counter2 += 2 in c
 
+    return counter1, counter2
+
+
+def tests() -> None:
+    assert count_passwords(111111, 111111) == (1, 0)
+    assert count_passwords(223450, 223450) == (0, 0)
+    assert count_passwords(123789, 123789) == (0, 0)
+    assert count_passwords(112233, 112233) == (1, 1)
+    assert count_passwords(123444, 123444) == (1, 0)
+    assert count_passwords(111122, 111122) == (1, 1)
+
+    # ranges across digit lengths agree with checking every number
+    assert count_passwords(1, 99_999) == brute_force(1, 100_000)
+    assert count_passwords(345, 12_345) == brute_force(345, 12_346)
+
+
+def run() -> None:
+    # puzzle_input
+    a: int = 172930
+    b: int = 683082
+
+    counter1, counter2 = count_passwords(a, b)
+
     assert counter1 == 1675
     assert counter2 == 1142
 
 
 if __name__ == "__main__":
+    tests()
     run()
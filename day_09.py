@@ -1,311 +1,8 @@
+import os
 from itertools import permutations
-from typing import Callable, List, Optional
-
-import helpers
-
-
-class IntCodeMachine:
-    symb = {
-        1: "add",
-        2: "mul",
-        3: "input",
-        4: "output",
-        5: "jump_if_!zero",
-        6: "jump_if_zero",
-        7: "if_less_than",
-        8: "if_equal",
-        9: "set_relative",
-        99: "halt",
-    }
-    test_mode = False
-    telemetry_flag = False
-    telemetry = dict()
-
-    debug_flag = False
-
-    def __init__(
-        self,
-        instructions: List[int],
-        quarters=None,
-        noun=None,
-        verb=None,
-        silent=False,
-    ):
-
-        self.pointer = 0
-        self.relative_base = 0
-        self.memory = list(instructions)
-
-        # for day_02/day13
-        self.memory[0] = self.memory[0] if quarters is None else quarters
-        self.memory[1] = self.memory[1] if noun is None else noun
-        self.memory[2] = self.memory[2] if verb is None else verb
-
-        # for day_05
-        self.hack_input: List[int] = []
-        self.stream_input: Optional[Callable] = None
-        self.buffer = None
-        self.debug_buffer = []
-
-        # silent is used to remove the print (annoying when running all AOC problems).
-        self.silent = silent
-
-        # Telemetry to help optimization
-        self.telemetry = {i: 0 for i, _ in enumerate(self.memory)}
-
-    def save(self):
-        with open("day_25.save", 'w', encoding='utf-8') as file:
-            file.write(str(self.pointer) + '\n')
-            file.write(str(self.relative_base) + '\n')
-            file.write(str(self.memory) + '\n')
-            file.write(str(self.silent) + '\n')
-
-    def load(self, path: str) -> None:
-        with open(path, 'r', encoding='utf-8') as file:
-            lines = file.readlines()
-
-        self.pointer = int(lines[0])
-        self.relative_base = int(lines[1])
-        self.memory = eval(lines[2])
-        self.silent = lines[3].startswith("True")
-
 
-
-    def memory_write(self, position, val):
-        while len(self.memory) < position + 1:
-            self.memory.append(0)
-
-        self.memory[position] = val
-
-    def memory_read(self, position):
-        if position < 0:
-            raise RuntimeError(
-                f"Expected the position to be zero or greater, but got {position}!"
-            )
-        while len(self.memory) < position + 1:
-            self.memory.append(0)
-        return self.memory[position]
-
-    def input(self, input: int):
-        self.hack_input.append(input)
-        return self
-
-    def stream_caller(self):
-        r = next(self.stream_input)
-        # print("R:", r)
-        return r
-
-    def op_codes(self):
-        while True:
-            # for debug purposes freeze the starting pointer
-            pointer = self.pointer
-
-            # set default flags for position_modes
-            position_modes = [0, 0, 0]
-
-            op = self.memory_read(self.pointer)
-
-            self.pointer += 1
-
-            if self.telemetry_flag:
-                self.telemetry[pointer] += 1
-
-            # setup the modes
-            if len(str(op)) > 2:
-                items = list(str(op))
-                while len(items) < 5:
-                    items.insert(0, 0)
-
-                op = int("".join(items[-2:]))
-                position_modes = [int(i) for i in reversed(items[0:-2])]
-
-            if op == 1:  # add
-                value_a = self.get_value(position_modes[0])
-                value_b = self.get_value(position_modes[1])
-                value_c = self.set_value(position_modes[2])
-                self.memory_write(value_c, value_a + value_b)
-
-                debug_args = [value_a, value_b, value_c]
-
-            elif op == 2:  # multiplication
-                value_a = self.get_value(position_modes[0])
-                value_b = self.get_value(position_modes[1])
-                value_c = self.set_value(position_modes[2])
-                self.memory_write(value_c, value_a * value_b)
-
-                debug_args = [value_a, value_b, value_c]
-
-            elif op == 3:  # input to param
-
-                # Hack to allow testing and not have to manually enter in a starting number
-                if len(self.hack_input) == 0 and self.stream_input is None:
-                    raise RuntimeError("Expected input from previous amp step...")
-
-                result = (
-                    self.hack_input.pop(0)
-                    if self.stream_input is None
-                    else self.stream_caller()
-                )
-
-                if self.hack_input is None and self.stream_input is None:
-                    result = input("INPUT:")
-
-                value_c = self.set_value(position_modes[0])
-                self.memory_write(value_c, int(result))
-
-                self.debug_buffer.insert(0, f"\tINPUT VALUE: {result}")
-                debug_args = [value_c]
-
-            elif op == 4:  # output
-                value_a = self.get_value(position_modes[0])
-                self.buffer = value_a
-
-                if not self.silent:
-                    print(">>", self.buffer)
-
-                if self.test_mode is False:
-                    if self.debug_flag:
-                        self.pprint_debug(pointer, op, [value_a], position_modes)
-                    return op, self.buffer
-
-                debug_args = [value_a]
-
-            elif op == 5:
-                """
-                If not zero, sets the instruction pointer to the value from the second parameter. 
-                Otherwise, it does nothing.
-                """
-                value_a = self.get_value(position_modes[0])
-                value_b = self.get_value(position_modes[1])
-                self.pointer = value_b if value_a != 0 else self.pointer
-
-                debug_args = [value_a, value_b]
-
-            elif op == 6:
-                """jump-if-zero: if the first parameter is zero, it sets the instruction pointer to the value
-                from the second parameter. Otherwise, it does nothing."""
-                value_a = self.get_value(position_modes[0])
-                value_b = self.get_value(position_modes[1])
-                self.pointer = value_b if value_a == 0 else self.pointer
-
-                debug_args = [value_a, value_b]
-
-            elif op == 7:
-                """if less than: set next arg to 1 else 0"""
-                value_a = self.get_value(position_modes[0])
-                value_b = self.get_value(position_modes[1])
-                value_c = self.set_value(position_modes[2])
-                self.memory_write(value_c, 1 if value_a < value_b else 0)
-
-                debug_args = [value_a, value_b, value_c]
-
-            elif op == 8:
-                """if equal: set next arg to 1 else 0"""
-                value_a = self.get_value(position_modes[0])
-                value_b = self.get_value(position_modes[1])
-                value_c = self.set_value(position_modes[2])
-
-                val = 1 if value_a == value_b else 0
-
-                self.memory_write(value_c, val)
-                debug_args = [value_a, value_b, value_c]
-
-            elif op == 9:
-                """adjusts the relative base by the value of its only parameter."""
-
-                value_a = self.get_value(position_modes[0])
-
-                self.relative_base += value_a
-
-                debug_args = [value_a]
-
-            elif op == 99:
-                """Halt: Exit Now..."""
-
-                self.pprint_debug(pointer, op, [], position_modes)
-                if self.debug_flag:
-                    while self.debug_buffer:
-                        print(self.debug_buffer.pop())
-
-                if not self.silent:
-                    print("Halting!")
-
-                if self.test_mode is True:
-                    return op, self.buffer
-
-                return None
-
-            else:
-                raise RuntimeError(
-                    f"Expected, 1-9 or 99, but received {op}\n"
-                    f" - current buffer: {self.buffer}\n"
-                    f" - current pointer: {self.pointer}\n"
-                    f" - memory dump: \n{self.memory}"
-                )
-
-            if self.debug_flag:
-                self.pprint_debug(pointer, op, debug_args, position_modes)
-                while self.debug_buffer:
-                    print(self.debug_buffer.pop())
-
-    def set_value(self, position_mode):
-        raw_value = self.memory_read(self.pointer)
-        self.pointer += 1
-        if position_mode == 0:
-            return raw_value
-        elif position_mode == 2:
-            x = raw_value + self.relative_base
-
-            return x
-
-    def get_value(self, position_mode):
-        """
-        - Mode 0: reads memory at pointer value
-        - Mode 1: returns the pointer value
-        - Mode 2: reads memory at pointer value + relative_base
-        """
-        # self.debug_buffer.insert(0, f"\tCurrent Pointer: {self.pointer}")
-        # self.debug_buffer.insert(0, f"\tCurrent Relative Pointer: {self.relative_base}")
-        # self.debug_buffer.insert(0, f"\tCurrent Memory: {self.memory}")
-
-        raw_value = self.memory_read(self.pointer)
-
-        if position_mode == 0:
-            # default mode
-            # self.debug_buffer.insert(
-            #     0,
-            #     f"\t[Mode {position_mode}] MemoryReadAtMemoryPointerValue({raw_value}) = {self.memory_read(raw_value)}",
-            # )
-            return_value = self.memory_read(raw_value)
-
-        elif position_mode == 1:
-            # self.debug_buffer.insert(
-            #     0, f"\t[Mode {position_mode}] MemoryRead({self.pointer}) = {raw_value}"
-            # )
-            return_value = raw_value
-
-        elif position_mode == 2:
-            # self.debug_buffer.insert(
-            #     0,
-            #     f"\t[Mode {position_mode}] MemoryRead({raw_value} + {self.relative_base}) = {self.memory_read(raw_value + self.relative_base)}",
-            # )
-
-            return_value = self.memory_read(raw_value + self.relative_base)
-
-        self.pointer += 1
-
-        return return_value
-
-    def pprint_debug(self, pointer, op, args, position_modes):
-        self.debug_buffer.insert(
-            0,
-            f"{self.telemetry[pointer]:06} | {pointer:04}: [{op:02}]: {self.symb[op]:>13} {tuple(args)} | Modes: {position_modes} | {self.relative_base}",
-        )
-
-
-def parse_instructions(path):
-    lines = helpers.get_lines(path)
-    return [int(v) for v in lines[0].split(",")]
+import intcode.checkpoint
+from intcode import IntCodeMachine, Policy, parse_instructions
 
 
 def get_result(amps):
@@ -386,21 +83,23 @@ def test_mode(
     rb_start=0,
     test_mode=False,
     telemetry_flag=False,
+    interpreted=False,
 ):
     collection = []
     m = IntCodeMachine(instructions).input(input_)
-    m.test_mode = test_mode
+    m.policy = Policy.RUN_TO_HALT if test_mode else Policy.YIELD_ON_OUTPUT
     m.relative_base = rb_start
     m.debug_flag = debug_flag
     m.telemetry_flag = telemetry_flag
     m.silent = True
+    op_codes = m.op_codes_interpreted if interpreted else m.op_codes
 
-    _, result = m.op_codes()
+    _, result = op_codes()
 
     while result is not None:
         collection.append(result)
         m.input(result)
-        results = m.op_codes()
+        results = op_codes()
 
         if results is None:
             break
@@ -415,7 +114,7 @@ def day_05_tests():
 
     # Part01: Use 1
     m = IntCodeMachine(instructions).input(1)
-    m.test_mode = True
+    m.policy = Policy.RUN_TO_HALT
     m.debug_flag = False
     results = m.op_codes()
     assert results[1] == 13978427
@@ -480,6 +179,91 @@ def day_09_tests():
         all = test_mode(item[0], debug_flag=False, test_mode=False)
         assert all == item[1]
 
+        all = test_mode(item[0], interpreted=True)
+        assert all == item[1]
+
+    # forks and snapshots continue independently from the same state
+    m = IntCodeMachine(test1, silent=True)
+    head = [m.op_codes()[1] for _ in range(5)]
+    checkpoint = m.snapshot()
+    fork = m.fork()
+    rest = [m.op_codes()[1] for _ in range(len(test1) - 5)]
+    assert head + rest == test1 and m.op_codes() is None
+    assert [fork.op_codes()[1] for _ in range(len(test1) - 5)] == rest
+    m.restore(checkpoint)
+    assert [m.op_codes()[1] for _ in range(len(test1) - 5)] == rest
+
+    # a fork shares the decode cache and blocks until one side rewrites its code: the
+    # input lands on the opcode at 5, so 104 outputs 42 and 4 outputs the cell at 42
+    selfmod = [3, 5, 1105, 1, 5, 104, 42, 1105, 1, 0]
+    for interpreted in (False, True):
+        m = IntCodeMachine(selfmod, silent=True)
+        m.debug_flag = interpreted
+        assert m.input(104).run_until() == [42]
+        fork = m.fork()
+        assert fork.decoded is m.decoded
+        assert fork.input(4).run_until() == [0] and m.input(104).run_until() == [42]
+        assert fork.decoded is not m.decoded and fork.input(4).run_until() == [0]
+
+    # ... and survive a round trip through the binary checkpoint format
+    for compress in (True, False):
+        data = intcode.checkpoint.dumps(checkpoint, m.policy.value, m.silent, compress)
+        m.restore(intcode.checkpoint.loads(data)[0])
+        assert [m.op_codes()[1] for _ in range(len(test1) - 5)] == rest
+
+    # a block indexes its operand pages directly: restoring an image from before the jump
+    # at 510 was compiled (its operand at 512 was never allocated) drops that block
+    jumper = [3, 9, 4, 9, 1105, 1, 510] + [0] * 503 + [1106, 0]
+    m = IntCodeMachine(jumper, silent=True).input(7)
+    before = m.snapshot()
+    m.save("day_09.icp")
+    assert m.run_until() == [7]
+    m.restore(before)
+    assert m.run_until() == [7]
+    m.load("day_09.icp")
+    assert m.run_until() == [7]
+
+    # a truncated checkpoint is a ValueError, not a BufferError from closing the map
+    m.save("day_09.icp", compress=False)
+    os.truncate("day_09.icp", os.path.getsize("day_09.icp") - 100)
+    try:
+        m.load("day_09.icp")
+        assert False, "a truncated checkpoint loaded"
+    except ValueError:
+        pass
+    os.remove("day_09.icp")
+
+    # values past 64 bits and addresses far beyond the program
+    b1 = [int(x) for x in "1102, 4294967296, 4294967296, 7, 4, 7, 99, 0".split(",")]
+    assert test_mode(b1) == test_mode(b1, interpreted=True) == [2 ** 64]
+    b2 = [int(x) for x in "1101, 5, 6, 1000000000, 4, 1000000000, 4, 999999999, 99".split(",")]
+    assert test_mode(b2) == test_mode(b2, interpreted=True) == [11, 0]
+
+    # self-modifying: 1101 at 0 rewrites the opcode of the next instruction into an output
+    s5 = [int(x) for x in "1101, 104, 0, 4, 1, 7, 99, 99".split(",")]
+    assert test_mode(s5) == test_mode(s5, interpreted=True) == [7]
+
+    # echo: a whole line fed at once comes back in order, and a fork keeps its own queue
+    echo = [3, 7, 4, 7, 1105, 1, 0, 0]
+    m = IntCodeMachine(echo, silent=True).feed("Hi\n")
+    fork = m.fork()
+    assert [m.op_codes()[1] for _ in range(3)] == [ord(c) for c in "Hi\n"]
+    assert len(fork.inputs) == 3 and fork.op_codes()[1] == ord("H")
+
+    # batch mode: one call collects everything until the input runs out (or N values)
+    assert fork.run_ascii() == "i\n" and not fork.halted
+    assert test_mode(test1, interpreted=True) == IntCodeMachine(test1).run_until()
+    assert IntCodeMachine(test1).run_until(outputs=3) == test1[:3]
+
+    # the profiled engine gives the same results and accounts for every instruction
+    assert test_mode(test1, telemetry_flag=True) == test1
+    m = IntCodeMachine(test1, silent=True)
+    m.telemetry_flag = True
+    assert m.run_until() == test1 and m.halted
+    report = m.profile.report()
+    assert report["instructions"] == sum(m.telemetry.values()) == sum(report["opcodes"].values())
+    assert report["branches"]["12"]["taken"] == len(test1) - 1
+
 
 def run_all_tests():
     day_05_tests()
@@ -495,6 +279,7 @@ def run():
 
     part01 = test_mode(i, debug_flag=False, test_mode=False)
     assert part01 == [2932210790]
+    assert test_mode(i, interpreted=True) == part01
 
     part02 = test_mode(
         i, debug_flag=False, test_mode=False, telemetry_flag=False, input_=2
@@ -1,4 +1,4 @@
-from day_09 import IntCodeMachine, parse_instructions
+from intcode import IntCodeMachine, parse_instructions
 
 DIRS = {
     "N": (-1, 0),
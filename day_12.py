@@ -2,121 +2,64 @@ from __future__ import annotations
 
 import re
 import sys
-from dataclasses import dataclass
-from typing import Optional
+from typing import List, Tuple
+
+import numpy as np
 
 import helpers
 
 pattern = re.compile(r"^.*=(-?\d+).*=(-?\d+).*=(-?\d+).*")
 
-@dataclass
-class Vec:
-    x: int
-    y: int
-    z: int
-
-
-class Moon:
-    def __init__(self, position: Vec, axis: Optional[chr]):
-        self.pos = position
-        self.axis = axis
-
-        self.vel: Vec = Vec(0, 0, 0)
-
-    def __repr__(self):
-        return f"Moon(pos={self.pos}, vel={self.vel})"
-
-    def __hash__(self):
-        if self.axis is None:
-            return hash(
-                (
-                    self.pos.x,
-                    self.pos.y,
-                    self.pos.z,
-                    self.vel.x,
-                    self.vel.y,
-                    self.vel.z,
-                )
-            )
-        elif self.axis == "x":
-            return self.hash_x()
-        elif self.axis == "y":
-            return self.hash_y()
-        elif self.axis == "z":
-            return self.hash_z()
-
-    def hash_x(self):
-        return hash((self.pos.x, self.vel.x))
-
-    def hash_y(self):
-        return hash((self.pos.y, self.vel.y))
-
-    def hash_z(self):
-        return hash((self.pos.z, self.vel.z))
-
-    def apply_gravity(self, other: Moon):
-        x = 1 if (x := self.pos.x - other.pos.x) < 0 else (0 if x == 0 else -1)
-        y = 1 if (y := self.pos.y - other.pos.y) < 0 else (0 if y == 0 else -1)
-        z = 1 if (z := self.pos.z - other.pos.z) < 0 else (0 if z == 0 else -1)
-
-        self.vel.x += x
-        self.vel.y += y
-        self.vel.z += z
-
-        other.vel.x -= x
-        other.vel.y -= y
-        other.vel.z -= z
-
-    def apply_velocity(self):
-        self.pos.x += self.vel.x
-        self.pos.y += self.vel.y
-        self.pos.z += self.vel.z
-
-    def calc_total_energy(self):
-        potential_energy = abs(self.pos.x) + abs(self.pos.y) + abs(self.pos.z)
-        kinetic_energy = abs(self.vel.x) + abs(self.vel.y) + abs(self.vel.z)
-        return potential_energy * kinetic_energy
-
-
-def get_moons(lines, axis=None):
-    moons = []
-    for line in lines:
-        x, y, z = re.search(pattern, line).groups()
-        moons.append(Moon(Vec(int(x), int(y), int(z)), axis=axis))
-    return moons
-
-
-def pprint_moon_info(moons, step=0, silent=False):
-    total_energy = sum(moon.calc_total_energy() for moon in moons)
+
+def read_positions(lines) -> np.ndarray:
+    """The moons' starting positions as a (moons, 3) array of x, y, z."""
+    return np.array([[int(v) for v in re.search(pattern, line).groups()] for line in lines], dtype=np.int64)
+
+
+def pprint_moon_info(pos, vel, step=0, silent=False):
+    energy = total_energy(pos, vel)
 
     if not silent:
-        print(f"Step [{step + 1}] has a Total Energy of {total_energy}")
-        for moon in moons:
-            print(
-                f"\t{moon} |==> {moon.calc_total_energy()} = {abs(moon.pos.x) + abs(moon.pos.y) + abs(moon.pos.z)} * {abs(moon.vel.x) + abs(moon.vel.y) + abs(moon.vel.z)}"
-            )
+        print(f"Step [{step + 1}] has a Total Energy of {energy}")
+        for p, v in zip(pos.tolist(), vel.tolist()):
+            potential, kinetic = sum(map(abs, p)), sum(map(abs, v))
+            print(f"\tMoon(pos={p}, vel={v}) |==> {potential * kinetic} = {potential} * {kinetic}")
+
+    return energy
+
 
-    return total_energy
+def gravity(pos: np.ndarray) -> np.ndarray:
+    """Every body's change in velocity: one toward each other body, per axis."""
+    if len(pos) <= 64:
+        # body i is pulled by the sign of pos[j] - pos[i] for every j
+        return np.sign(pos[None, :, :] - pos[:, None, :]).sum(axis=1)
 
+    # for many bodies the n x n matrix gets big; count the bodies above and below instead
+    ordered = np.sort(pos, axis=0)
+    pull = np.empty_like(pos)
+    for axis in range(pos.shape[1]):
+        below = np.searchsorted(ordered[:, axis], pos[:, axis], side="left")
+        above = len(pos) - np.searchsorted(ordered[:, axis], pos[:, axis], side="right")
+        pull[:, axis] = above - below
+    return pull
 
-def part_01(lines):
 
-    result = 0
-    moons = get_moons(lines)
-    for step in range(1000):  # get 1000th step Total Energy
-        a, b, c, d = moons
-        a.apply_gravity(b)
-        a.apply_gravity(c)
-        a.apply_gravity(d)
-        b.apply_gravity(c)
-        b.apply_gravity(d)
-        c.apply_gravity(d)
+def simulate(positions, steps: int, velocities=None) -> Tuple[np.ndarray, np.ndarray]:
+    """Positions and velocities of any number of bodies after `steps` steps."""
+    pos = np.array(positions, dtype=np.int64)
+    vel = np.zeros_like(pos) if velocities is None else np.array(velocities, dtype=np.int64)
+    for _ in range(steps):
+        vel += gravity(pos)
+        pos += vel
+    return pos, vel
 
-        [moon.apply_velocity() for moon in moons]
 
-        result = pprint_moon_info(moons, step, silent=True)
+def total_energy(pos: np.ndarray, vel: np.ndarray) -> int:
+    return int((np.abs(pos).sum(axis=1) * np.abs(vel).sum(axis=1)).sum())
 
-    return result
+
+def part_01(lines, steps=1000):
+    return total_energy(*simulate(read_positions(lines), steps))
 
 
 def get_number_divisible_by_all(x, y):
@@ -127,36 +70,37 @@ def get_number_divisible_by_all(x, y):
             return r
 
 
-def get_first_hash_hit(lines, axis=None, silent=False):
-    hashes = set()
-    moons = get_moons(lines, axis=axis)
-    for step in range(sys.maxsize):
-        a, b, c, d = moons
-        a.apply_gravity(b)
-        a.apply_gravity(c)
-        a.apply_gravity(d)
-        b.apply_gravity(c)
-        b.apply_gravity(d)
-        c.apply_gravity(d)
+def find_periods(positions: np.ndarray) -> List[int]:
+    """
+    Steps until each axis first comes back to its starting state, for any number of
+    moons.  The axes never affect each other and a step can always be undone, so the
+    first repeat of an axis is its starting state: it is enough to compare against
+    that instead of keeping every state seen.
+    """
+    start = positions
+    pos = positions.copy()
+    vel = np.zeros_like(pos)
+
+    periods = [0, 0, 0]
+    step = 0
+    while not all(periods):
+        vel += gravity(pos)
+        pos += vel
+        step += 1
 
-        a.apply_velocity()
-        b.apply_velocity()
-        c.apply_velocity()
-        d.apply_velocity()
+        # an axis can only be back at its start once all of its velocities are 0
+        if not vel.all():
+            for axis in np.flatnonzero(~vel.any(axis=0)):
+                if not periods[axis] and (pos[:, axis] == start[:, axis]).all():
+                    periods[axis] = step
 
-        new_hash = hash((moons[0], moons[1], moons[2], moons[3]))
-        if new_hash in hashes:
-            pprint_moon_info(moons, step=step - 1, silent=silent)
-            return step
-        else:
-            hashes.add(new_hash)
+    return periods
 
 
 def part_02(lines, silent=True):
-    # this part could be optimized to look for all three in one pass...
-    x = get_first_hash_hit(lines, axis="x", silent=silent)
-    y = get_first_hash_hit(lines, axis="y", silent=silent)
-    z = get_first_hash_hit(lines, axis="z", silent=silent)
+    x, y, z = find_periods(read_positions(lines))
+    if not silent:
+        print(f"Periods: {x=}, {y=}, {z=}")
 
     a = get_number_divisible_by_all(x, y)
     b = get_number_divisible_by_all(x, z)
@@ -176,9 +120,19 @@ def tests():
         "\n"
     )
 
+    assert part_01(test_01, steps=10) == 179
+
     part_02_test_01 = part_02(test_01, silent=True)
     assert part_02_test_01 == 2772, f"Expected 2772, but got {part_02_test_01}"
 
+    test_02 = "<x=-8, y=-10, z=0>\n<x=5, y=5, z=10>\n<x=2, y=-7, z=3>\n<x=9, y=-8, z=-3>".split("\n")
+    assert part_01(test_02, steps=100) == 1940
+    assert part_02(test_02) == 4686774924
+
+    # counting above and below gives the same pull as the sign matrix
+    pos = np.random.default_rng(0).integers(-50, 50, size=(200, 3))
+    assert (gravity(pos) == np.sign(pos[None, :, :] - pos[:, None, :]).sum(axis=1)).all()
+
 
 if __name__ == "__main__":
     tests()
@@ -1,7 +1,7 @@
 import os
 from typing import NamedTuple
 
-from day_09 import IntCodeMachine, parse_instructions
+from intcode import IntCodeMachine, parse_instructions
 
 tile_type = {
     0: " ",  # empty
@@ -30,7 +30,7 @@ class Arcade:
         self.m = IntCodeMachine(instructions, quarters=self.quarters, silent=True,)
         # self.m.debug_flag = True
         # self.m.telemetry_flag = True
-        self.m.stream_input = self.yield_joystick_position()
+        self.m.inputs.source = self.yield_joystick_position()
 
     def yield_joystick_position(self):
         while True:
@@ -41,30 +41,22 @@ class Arcade:
         paddle_pos = Pos(0, 0)
 
         codes = list()
-        counter = 1
         while True:
-            # break out if you can
-            results = self.m.op_codes()
-            if results is None:
+            # one x, y, tile triple per call; break out if you can
+            tile = self.m.run_until(outputs=3)
+            if len(tile) < 3:
                 break
 
-            op, code = results
-            if op == 4:
-                if counter % 3 == 0:
-                    if code == 4:  # ball on the move
+            x, y, code = tile
+            if code == 4:  # ball on the move
+                ball_new = Pos(x, y)
+                self.joystick_position = self.ball_target(ball_new, paddle_pos)
+                # print(f"[{self.joystick_position}] ball_new = {ball_new}, paddle = {paddle_pos}")
 
-                        ball_new = Pos(*codes[-2:])
-                        self.joystick_position = self.ball_target(ball_new, paddle_pos)
-                        # print(f"[{self.joystick_position}] ball_new = {ball_new}, paddle = {paddle_pos}")
-
-                    elif code == 3:  # paddle updated
-                        paddle_pos = Pos(*codes[-2:])
-                        # print(f"[{self.joystick_position}] ball_new = {ball_new}, paddle = {paddle_pos}")
-                    else:
-                        pass
-                        # print(op, code, results)
-            codes.append(code)
-            counter += 1
+            elif code == 3:  # paddle updated
+                paddle_pos = Pos(x, y)
+                # print(f"[{self.joystick_position}] ball_new = {ball_new}, paddle = {paddle_pos}")
+            codes.extend(tile)
 
         assert len(codes) % 3 == 0
         return self.m.buffer, codes
@@ -129,15 +121,8 @@ def part_02(instructions):
 
 
 def get_machine_codes(instructions, input):
-    codes = list()
     m = IntCodeMachine(instructions, noun=2, silent=True).input(input)
-    while True:
-        # break out if you can
-        results = m.op_codes()
-        if results is None:
-            break
-        _, code = results
-        codes.append(code)
+    codes = m.run_until()
     assert len(codes) % 3 == 0
     return codes
 
@@ -2,9 +2,8 @@ import json
 import os
 import random
 import display
-from day_09 import IntCodeMachine, parse_instructions
-import helpers
-from typing import List, Tuple
+import grid
+from intcode import IntCodeMachine, parse_instructions
 from ast import literal_eval
 
 
@@ -40,18 +39,9 @@ class Maze:
         instructions = parse_instructions(r"./data/day_15.txt")
         self.m = IntCodeMachine(instructions, silent=True)
 
-    def successors(self, state: Tuple[int, int]) -> List[Tuple[int, int]]:
-        succs = []
-        for k, v in Maze.moves.items():
-            new_position = Maze.add_position(state, v)
-            response = self.map.get(new_position, "#")
-            if response != "#":
-                succs.append(new_position)
-
-        return succs
-
-    def goal(self, state):
-        return self.map[state] == "0"
+    def compile(self) -> grid.Grid:
+        # cells never explored count as walls
+        return grid.Grid.from_map(self.map)
 
     @staticmethod
     def add_position(pos1, pos2):
@@ -113,27 +103,14 @@ class Maze:
 
 
 def shortest_path_to_oxygen(m):
-    r = helpers.bfs((0, 0), m.goal, m.successors, debug=False)
-    return (
-        helpers.get_node_path_results(r, silent=True) - 1
-    )  # don't count starting position -- only moves
+    g = m.compile()
+    return grid.astar(g, g.node(0, 0), g.node(*m.goal_pos))
 
 
 def steps_to_oxygen_filled_maze(m):
-    level = -1  # first item doesn't count
-    visited = [m.goal_pos]
-    results = m.successors(m.goal_pos)
-    while results:
-        new_results = []
-        for t in results:
-            if t not in visited:
-                new_results.extend(m.successors(t))
-                visited.append(t)
-        results = new_results
-        # Uncomment to generate the ppm layers
-        # m.display(mark=visited, level=level)
-        level += 1
-    return level
+    # the oxygen fills one step per minute, so it takes as long as the farthest cell is away
+    g = m.compile()
+    return max(grid.distances(g, g.node(*m.goal_pos)).values())
 
 
 def run():
@@ -1,6 +1,9 @@
+import math
 from typing import List, Optional
 from dataclasses import dataclass
 
+import numpy as np
+
 import helpers
 
 
@@ -37,23 +40,94 @@ class FFT:
 
         return results
 
+    @staticmethod
+    def phase(signal: np.ndarray) -> np.ndarray:
+        """
+        One phase from prefix sums: output digit k (1 indexed) adds the blocks of k
+        digits starting at k - 1, 5k - 1, 9k - 1, ... and subtracts the ones starting
+        at 3k - 1, 7k - 1, ..., so each block is a difference of two prefix sums.
+
+        Short blocks are summed per k with strided slices; for long ones there are only
+        a few blocks per k, so each block index j is done for all of those k at once.
+        """
+        n = len(signal)
+        short = max(1, int((n / 4) ** 0.5))
+        # padded so a block running off the end just stops there
+        prefix = np.empty(n + 1 + 4 * short, dtype=np.int64)
+        prefix[0] = 0
+        np.cumsum(signal, out=prefix[1 : n + 1])
+        prefix[n + 1 :] = prefix[n]
+
+        totals = np.zeros(n, dtype=np.int64)
+        for k in range(1, min(short, n) + 1):
+            plus, minus = slice(k - 1, n, 4 * k), slice(3 * k - 1, n, 4 * k)
+            totals[k - 1] = (
+                prefix[2 * k - 1 : n + k : 4 * k].sum()
+                - prefix[plus].sum()
+                - prefix[4 * k - 1 : n + k : 4 * k].sum()
+                + prefix[minus].sum()
+            )
+
+        j = 0
+        while short < n and (4 * j + 1) * (short + 1) <= n:
+            # every k whose block j starts inside the signal
+            k = np.arange(short + 1, min(n, n // (4 * j + 1)) + 1, dtype=np.int64)
+            start = k - 1 + 4 * k * j
+            totals[k - 1] += prefix[np.minimum(start + k, n)] - prefix[start]
+            start = np.minimum(start + 2 * k, n)
+            totals[k - 1] -= prefix[np.minimum(start + k, n)] - prefix[start]
+            j += 1
+
+        return np.abs(totals) % 10
 
-def mutate(data, offset=7):
-    """This works only if the message_offset is in the last half of the data."""
+
+def mutate(data, offset=7, phases=100, binomial=False):
+    """
+    This works only if the message_offset is in the last half of the data: there
+    every digit's pattern is 0s up to itself and 1s after, so a phase turns the tail
+    into its reversed cumulative sum mod 10.
+
+    binomial=True skips the phases and reads the 8 digits straight off the tail: after
+    p phases digit i is the sum of C(j - i + p - 1, p - 1) * tail[j] over j >= i.
+    """
     message_offset = int(''.join(str(x) for x in data[0:offset]))
     assert message_offset > len(data) / 2
 
-    data1 = data[message_offset:]
-    for _ in range(100):
+    tail = np.array(data[message_offset:], dtype=np.int32)
+    if binomial:
+        return int("".join(str(d) for d in first_digits(tail, phases)))
+
+    backwards = tail[::-1]
+    for _ in range(phases):
+        np.cumsum(backwards, out=backwards)
+        np.remainder(backwards, 10, out=backwards)
+
+    return int(''.join(str(i) for i in tail[:8]))
 
-        t = sum(data1)
 
-        for i in range(len(data1)):
-            old = data1[i]
-            data1[i] = t % 10
-            t -= old
+def binomial_mod(n: np.ndarray, k: int, p: int) -> np.ndarray:
+    """C(n, k) mod a prime p for every n, by Lucas' theorem."""
+    small = np.zeros((p, p), dtype=np.int64)
+    for a in range(p):
+        for b in range(a + 1):
+            small[a, b] = math.comb(a, b) % p
 
-    return int(''.join(str(i) for i in data1[:8]))
+    result = np.ones(len(n), dtype=np.int64)
+    n = n.copy()
+    while k:
+        result = result * small[n % p, k % p] % p
+        n //= p
+        k //= p
+    return result
+
+
+def first_digits(tail: np.ndarray, phases: int, count: int = 8) -> List[int]:
+    n = np.arange(len(tail), dtype=np.int64) + phases - 1
+    # mod 2 and mod 5 joined back into mod 10
+    coefficients = (5 * binomial_mod(n, phases - 1, 2) + 6 * binomial_mod(n, phases - 1, 5)) % 10
+
+    tail = tail.astype(np.int64)
+    return [int(coefficients[: len(tail) - i] @ tail[i:] % 10) for i in range(count)]
 
 
 def tests():
@@ -75,15 +149,20 @@ def tests():
         signal = f.repeat_phrase(signal)
     assert signal[0:8] == [2, 4, 1, 7, 6, 1, 7, 6]
 
-    signal = [int(i) for i in list("03036732577212944063491565474664" * 10_000)]
+    # the prefix sum phase agrees with repeat_phrase
+    signal = [int(i) for i in list("80871224585914546619083218645595")]
+    assert f.phase(np.array(signal)).tolist() == f.repeat_phrase(signal)
+
+    # the whole 320,000 digit part 2 example, phase by phase
+    signal = np.array([int(i) for i in list("03036732577212944063491565474664" * 10_000)])
     i = 303673
     for _ in range(100):
-        signal = f.repeat_phrase(signal)
-        print(signal[i : i + 8])
-    #
-    # i = 303673
-    # print(signal[i:i+8])
-    # print(signal)
+        signal = f.phase(signal)
+    assert signal[i : i + 8].tolist() == [8, 4, 4, 6, 2, 0, 2, 6]
+
+    # and mutate reads the same message off the tail
+    signal = [int(i) for i in list("03036732577212944063491565474664")] * 10_000
+    assert mutate(signal) == mutate(signal, binomial=True) == 84462026
 
 
 def run():
@@ -95,15 +174,17 @@ def run():
     f = FFT()
 
     # part 01
+    signal = np.array(signal)
     for _ in range(100):
-        signal = f.repeat_phrase(signal)
+        signal = f.phase(signal)
 
     assert "".join((str(c) for c in signal[0:8])) == "67481260"
 
     # part 02
-    signal = [int(i) for i in lines[0]]
-    result = mutate(signal[:] * 10_000, offset=7)
+    signal = np.tile([int(i) for i in lines[0]], 10_000)
+    result = mutate(signal, offset=7)
     assert result == 42178738
+    assert mutate(signal, offset=7, binomial=True) == result
     # print("PART02:", result)
 
 
@@ -1,7 +1,8 @@
-from day_09 import IntCodeMachine, parse_instructions
+import grid
+from intcode import IntCodeMachine, parse_instructions
 from collections import deque
 from itertools import combinations, permutations
-from typing import Set, Tuple, List
+from typing import Optional, Set, Tuple, List
 
 
 class Node:
@@ -24,23 +25,15 @@ class Ascii:
         self.scaffolding: Set[Tuple[int, int]] = set()
         self.crossovers: Set[Tuple[int, int]] = set()
         self.space_dust = 0
+        self.scaffold: Optional[grid.Grid] = None
 
         self.m = IntCodeMachine(instructions, override, silent=True)
 
     def extract_grid(self):
-        line = ""
-        while True:
-            results = self.m.op_codes()
-            if results is None:
-                break
-            op, code = results
-            code = int(code)
-            if code == 10:
-                if len(line) > 1:
-                    self.grid.append(list(line))
-                line = ""
-            else:
-                line += chr(code)
+        # only lines ended by a newline count, the same as printing them would
+        for line in self.m.run_ascii().split("\n")[:-1]:
+            if len(line) > 1:
+                self.grid.append(list(line))
 
     def identify_crossovers(self):
         total = 0
@@ -70,9 +63,11 @@ class Ascii:
                     self.current_pos = {(r, c): self.grid[r][c]}
                     self.grid[r][c] = "#"
 
+        self.scaffold = grid.Grid(self.grid, passable=lambda icon: icon == "#")
+
     def goal(self, visited: List[str], node: Node) -> List:
         if len(self.scaffolding) == len(visited):
-            items = format_search_results(node)
+            items = format_search_results(node, self.scaffold)
             return is_pattern(items)
         return []
 
@@ -85,10 +80,8 @@ class Ascii:
         return abs(pos1[0] - pos2[0] + pos1[1] - pos2[1])
 
     def successors(self, position):
-
+        # position is {node: heading}; each successor is {new heading: [nodes walked]}
         k, v = [(k, v) for k, v in position.items()][0]
-        dirs = list(self.dirs.keys())
-        index = dirs.index(v)
 
         succs = []
         directions = {
@@ -98,19 +91,13 @@ class Ascii:
             "<": ["^", "v"],
         }
 
-        for (x, y), direction in zip(self.dirs[v], directions[dirs[index]]):
+        headings = list(self.dirs.keys())  # clockwise, the same as grid.DIRECTIONS
+        for direction in directions[v]:
             moves = []
-            xn, yn = self.add_positions(k, (x, y))
-            while True:
-
-                if 0 <= xn < len(self.grid) and 0 <= yn < len(self.grid[0]):
-                    if self.grid[xn][yn] == "#":
-                        moves.append((xn, yn))
-                        xn, yn = self.add_positions((xn, yn), (x, y))
-                    else:
-                        break
-                else:
-                    break
+            node = self.scaffold.toward(k, headings.index(direction))
+            while node >= 0:
+                moves.append(node)
+                node = self.scaffold.toward(node, headings.index(direction))
 
             if moves:
                 succs.append({direction: moves})
@@ -130,8 +117,9 @@ class Ascii:
 
 
 def do_search(machine):
-    frontier = deque([Node(machine.current_pos, None)])
-    cached = {str(machine.current_pos)}
+    start = {machine.scaffold.node(*k): v for k, v in machine.current_pos.items()}
+    frontier = deque([Node(start, None)])
+    cached = {str(start)}
     visited = set()
     while frontier:
         node = frontier.pop()
@@ -149,7 +137,7 @@ def do_search(machine):
                         frontier.append(Node(new, node))
 
 
-def format_search_results(node):
+def format_search_results(node, scaffold):
     # need to convert this now into movement instructions
     final_list = []
     while node.parent:
@@ -164,7 +152,7 @@ def format_search_results(node):
         k2, v2 = [(k, v) for k, v in b.items()][0]
 
         icon = "R" if dirs[(dirs.index(v1) + 1) % len(dirs)] == v2 else "L"
-        distance = Ascii.sub_positions(k1, k2)
+        distance = Ascii.sub_positions(scaffold.position(k1), scaffold.position(k2))
         items.append(f"{icon},{distance}")
     return items
 
@@ -246,15 +234,10 @@ def run():
     # Part 2 needs to run the program in a specific way
     ascii = Ascii(instructions, 2)
     for routine in program_routines:
-        for c in list(routine):
-            ascii.m.input(ord(c))
-        ascii.m.input(ord("\n"))
-
-    while True:
-        results = ascii.m.op_codes()
-        if results is None:
-            part02 = ascii.m.buffer
-            break
+        ascii.m.feed(routine + "\n")
+
+    ascii.m.run_until(on_input_starved=False)
+    part02 = ascii.m.buffer
     assert part02 == 862452
 
 
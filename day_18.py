@@ -1,7 +1,9 @@
 from __future__ import annotations
+import grid
 import helpers
 from collections import deque, namedtuple
-from typing import NamedTuple, Optional, List, TypeVar, Callable, Tuple
+from heapq import heappop, heappush
+from typing import Dict, NamedTuple, Optional, List, TypeVar, Callable, Tuple
 from dataclasses import dataclass
 
 
@@ -39,6 +41,16 @@ class Maze:
                     cls.maze[r][c] = icon
                     index += 1
 
+        cls.grid = grid.Grid(cls.maze)
+        cls.key_at = {cls.grid.node(*pos): key for key, pos in cls.keys.items()}
+
+        # per grid node: the keymask bit picked up there, and the bit a door there needs
+        cls.key_bits = [key_bit(icon) if icon.islower() else 0 for icon in cls.grid.cells]
+        cls.door_bits = [key_bit(icon) if icon.isupper() else 0 for icon in cls.grid.cells]
+        cls.everything = 0
+        for bit in cls.key_bits:
+            cls.everything |= bit
+
         return cls()
 
     def get_start_positions(self):
@@ -64,23 +76,13 @@ class Maze:
                 print(icon, end="")
             print()
 
-    def goal(self, keys):
-        return len(keys) == len(self.keys)
-
-    def successors(self, state: SearchState) -> Optional[List[Pos]]:
-        neighbors = []
-        for (r, c) in [(-1, 0), (1, 0), (0, 1), (0, -1)]:
-            row = state.pos.row + r
-            col = state.pos.col + c
-            if 0 <= row < self.rows and 0 <= col < self.cols:
-                icon = self.maze[row][col]
-                if icon == "#" or (
-                    icon.isalpha() and icon.isupper() and icon.lower() not in state.keys
-                ):
-                    continue
-                neighbors.append(Pos(row, col))
+    def goal(self, keys: int) -> bool:
+        return keys == self.everything
 
-        return neighbors
+    def successors(self, node: int, keys: int) -> List[int]:
+        # walls have no edges, so only doors need checking
+        doors = self.door_bits
+        return [target for target in self.grid.neighbors(node) if not doors[target] & ~keys]
 
 
 T = TypeVar("T")
@@ -96,36 +98,99 @@ class Node:
 SearchState = namedtuple("SearchState", "pos, keys")
 
 
-def bfs(maze, start_state, goal: Callable):
-    frontier = deque([Node(SearchState(start_state, tuple()), None, 0)])
-    visited = set()
+def bfs(maze, start_state: Pos, goal: Callable):
+    """
+    Cell by cell BFS over (node, keymask).  A state is packed into the one int
+    keymask * cells + node, and only the states themselves are kept, so the node
+    returned carries the steps and final state but no path.
+    """
+    cells = len(maze.grid)
+    key_bits = maze.key_bits
+    start = maze.grid.node(*start_state)
+    frontier = [start]
+    visited = {start}
 
+    steps = 0
     while frontier:
-        node = frontier.popleft()
-        state = node.state
-
-        if goal(state.keys) is True:
-            # print("Result:", node.steps, node.state.keys)
-            return node
-
-        for s in maze.successors(state):
-            new_key = {k for k, v in maze.keys.items() if v == s}
-            new_state = SearchState(s, tuple(set(state.keys) | new_key))
-            if new_state not in visited:
-                visited.add(new_state)
-                frontier.append(Node(new_state, node, node.steps + 1))
-
-
-def display_if_path(m, s):
-    if s is None:
-        print("Failed")
-    else:
-        path = []
-        parent = s
-        while parent:
-            path.append(parent.state.pos)
-            parent = parent.parent
-        m.display(path=path)
+        following = []
+        for state in frontier:
+            keys, pos = divmod(state, cells)
+            if goal(keys) is True:
+                return Node(SearchState(pos, keys), None, steps)
+
+            for s in maze.successors(pos, keys):
+                new_state = (keys | key_bits[s]) * cells + s
+                if new_state not in visited:
+                    visited.add(new_state)
+                    following.append(new_state)
+        frontier = following
+        steps += 1
+
+
+def key_bit(icon: str) -> int:
+    """The keymask bit of a key, or of the key that opens a door."""
+    return 1 << (ord(icon.lower()) - ord("a"))
+
+
+# to key node: (steps, doors in the way, other keys passed on the way, the key's bit)
+KeyPath = Tuple[int, int, int, int]
+
+
+def key_paths(maze, start: int) -> Dict[int, KeyPath]:
+    """
+    The shortest walk from a grid node to every key it can reach, ignoring doors but
+    noting the keymask of the doors it passes so the search can tell when it is open.
+    """
+    offsets, targets, cells = maze.grid.offsets, maze.grid.targets, maze.grid.cells
+    paths = {}
+    seen = {start}
+    frontier = deque([(start, 0, 0, 0)])
+    while frontier:
+        node, steps, doors, keys = frontier.popleft()
+        icon = cells[node]
+        if node != start:
+            if icon.islower():
+                paths[node] = steps, doors, keys, key_bit(icon)
+                keys |= key_bit(icon)
+            elif icon.isupper():
+                doors |= key_bit(icon)
+
+        for i in range(offsets[node], offsets[node + 1]):
+            target = targets[i]
+            if target not in seen:
+                seen.add(target)
+                frontier.append((target, steps + 1, doors, keys))
+    return paths
+
+
+def collect_keys(maze, starts: List[Pos]) -> Optional[int]:
+    """
+    Fewest steps for robots at `starts` to collect every key, by Dijkstra over
+    (robot nodes, keymask) on the key graph.  Only one robot moves at a time, so the
+    four robots of part 2 wait on each other's keys through the doors mask.
+    """
+    robots = tuple(maze.grid.node(*pos) for pos in starts)
+    paths = {node: key_paths(maze, node) for node in robots + tuple(maze.key_at)}
+
+    best = {(robots, 0): 0}
+    frontier = [(0, robots, 0)]
+    while frontier:
+        steps, robots, mask = heappop(frontier)
+        if maze.goal(mask):
+            return steps
+        if best[(robots, mask)] < steps:
+            continue
+
+        for robot, node in enumerate(robots):
+            for target, (distance, doors, keys, bit) in paths[node].items():
+                # a key still on the way is always worth picking up first
+                if mask & bit or doors & ~mask or keys & ~mask:
+                    continue
+                state = robots[:robot] + (target,) + robots[robot + 1 :], mask | bit
+                if steps + distance < best.get(state, steps + distance + 1):
+                    best[state] = steps + distance
+                    heappush(frontier, (steps + distance, *state))
+    return None
 
 
 def tests():
@@ -164,34 +229,25 @@ def tests():
         "\n"
     )
 
-    m = Maze.load_object_data(t1)
-    r = bfs(m, m.current_pos, goal=m.goal)
-    assert r.steps == 8
+    for t, steps in [(t1, 8), (t2, 86), (t4, 81), (t5, 136), (t3, 132)]:
+        m = Maze.load_object_data(t)
+        r = bfs(m, m.current_pos, goal=m.goal)
+        assert r.steps == steps
+        assert collect_keys(m, [m.current_pos]) == steps
 
-    m = Maze.load_object_data(t2)
-    r = bfs(m, m.current_pos, goal=m.goal)
-    assert r.steps == 86
-
-    m = Maze.load_object_data(t4)
-    r = bfs(m, m.current_pos, goal=m.goal)
-    assert r.steps == 81
-
-    m = Maze.load_object_data(t5)
-    r = bfs(m, m.current_pos, goal=m.goal)
-    assert r.steps == 136
-
-    m = Maze.load_object_data(t3)
-    r = bfs(m, m.current_pos, goal=m.goal)
-    assert r.steps == 132
     print("Tests complete.")
 
 
 def run():
-    # part01
     instructions = helpers.get_lines(r"./data/day_18.txt")
+
+    # part01
     m = Maze.load_object_data(instructions)
-    r = bfs(m, m.current_pos, goal=m.goal)
-    assert r.steps == 5402
+    assert collect_keys(m, [m.current_pos]) == 5402
+
+    # part02
+    m = Maze.load_object_data(instructions, part2=True)
+    assert collect_keys(m, m.get_start_positions()) == 2138
 
 
 def tests2():
@@ -204,47 +260,46 @@ def tests2():
 #######""".split(
         "\n"
     )
+    t2 = """###############
+#d.ABC.#.....a#
+######@#@######
+###############
+######@#@######
+#b.....#.....c#
+###############""".split(
+        "\n"
+    )
+    t3 = """#############
+#DcBa.#.GhKl#
+#.###@#@#I###
+#e#d#####j#k#
+###C#@#@###J#
+#fEbA.#.FgHi#
+#############""".split(
+        "\n"
+    )
+    t4 = """#############
+#g#f.D#..h#l#
+#F###e#E###.#
+#dCba@#@BcIJ#
+#############
+#nK.L@#@G...#
+#M###N#H###.#
+#o#m..#i#jk.#
+#############""".split(
+        "\n"
+    )
 
-    def goal(t: Tuple[str]):
-        def g(keys):
-            for key in keys:
-                if key not in t:
-                    return True
-            return False
-
-        return g
-
-    k = set()
     m = Maze.load_object_data(t1, part2=True)
-    print(m.display())
-    g = goal(tuple(k))
-    total = 0
-
-    counter = 0
-    positions = m.get_start_positions()
-    while positions:
-        pos = positions[counter % len(positions)]
-        r = bfs(m, pos, goal=g)
-        if r is not None:
-            total += r.steps
-            for item in r.state.keys:
-                k.add(item)
-            g = goal(tuple(k))
-            print(r.state.pos, k)
-            # positions[counter % len(positions)] = r.state.pos
-        counter += 1
-
-    print("Total:", total)
+    assert collect_keys(m, m.get_start_positions()) == 8
+
+    for t, steps in [(t2, 24), (t3, 32), (t4, 72)]:
+        m = Maze.load_object_data(t)
+        assert collect_keys(m, m.get_start_positions()) == steps
+    print("Tests complete.")
 
 
 if __name__ == "__main__":
-    # tests()
-    # run()
+    tests()
     tests2()
-
-    # instructions = helpers.get_lines(r"./data/day_18.txt")
-    # m = Maze.load_object_data(instructions, part2=True)
-    # m.display()
-    # print(m.current_pos)
-
-    # m = Maze(instructions, part2=True)
+    run()
@@ -1,55 +1,163 @@
-from day_09 import IntCodeMachine, parse_instructions
+import bisect
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
 
+import numpy as np
 
-def run_machine(col, row):
+from intcode import IntCodeMachine, Policy, parse_instructions
+from intcode.lanes import MAX_CELLS, LaneMachine
+
+
+@lru_cache(maxsize=1)
+def drone_machine() -> IntCodeMachine:
+    """The drone program run up to its first input; every probe forks from here."""
     instructions = parse_instructions(r"./data/day_19.txt")
-    m = IntCodeMachine(instructions, silent=True).input(col).input(row)
+    m = IntCodeMachine(instructions, silent=True, policy=Policy.BLOCK_ON_INPUT)
+    m.op_codes()
+    m.policy = Policy.YIELD_ON_OUTPUT
+    return m
+
+
+def run_machine(col, row):
+    m = drone_machine().fork().input(col).input(row)
     m.op_codes()
     return m.buffer
 
 
+def probe(points: List[Tuple[int, int]], max_cells: int = MAX_CELLS) -> np.ndarray:
+    """
+    Beam (1) or not (0) for every pair of drone inputs, in batched runs.  Each run
+    fills half of max_cells with the program, so its lanes have room to use memory
+    past it without going scalar.
+    """
+    instructions = parse_instructions(r"./data/day_19.txt")
+    chunk = max_cells // (2 * len(instructions))
+    results = []
+    for start in range(0, len(points), chunk):
+        lanes = points[start : start + chunk]
+        m = LaneMachine(instructions, lanes=len(lanes), max_cells=max_cells).feed(lanes)
+        m.run()
+        results.append(m.outputs[:, 0])
+    return np.concatenate(results)
+
+
 def iterate(count, silent=False):
-    total = 0
-    for row in range(count):
-        for col in range(count):
-            r = run_machine(row, col)
-            total += r
-            if not silent:
-                icon = "#" if r == 1 else "."
-                print(icon, end="")
-        if not silent:
-            print()
-
-    return total
-
-
-def iterate2(row_start, row_end, col_start, col_end):
-    c = {}
-
-    for x in range(row_start, row_end):
-        n = 0
-        lo = 0
-        for y in range(col_start, col_end):
-            r = run_machine(x, y)
-
-            # Get last zero before the ones for the lo
-            if n == 0 and r == 1:
-                lo = y
-
-            n += r
-
-            # Get last '1' to get the hi number
-            if n >= 100 and r == 0:
-                hi = lo + n
-                c[x] = (lo, hi)
-
-                if x - 99 in c:
-                    a, b = c[x - 99]
-                    if a <= lo + 1 and (lo + 100) <= b:
-                        winner = (x - 99) * 10_000 + lo
-                        # print("winner:", x - 99, lo, winner)
-                        return winner
+    grid = probe([(row, col) for row in range(count) for col in range(count)])
+    grid = grid.reshape(count, count)
+
+    if not silent:
+        for line in grid:
+            print("".join("#" if r == 1 else "." for r in line))
+
+    return int(grid.sum())
+
+
+class Beam:
+    """
+    The tractor beam's edges, row by row, found with as few drone probes as possible.
+
+    A row x of the beam is the run of y from lo to hi (inclusive).  The beam is a cone
+    from the origin, so any row's edges are first estimated from the nearest known
+    row along the beam's slope, then walked to the real edge one probe at a time; the
+    next row of a row by row scan starts next to the previous row's edges.  Every probe
+    lands in a coordinate cache, and square() gallops over rows rather than scanning.
+    """
+
+    def __init__(self, probe: Callable[[int, int], int] = None):
+        self.probe = run_machine if probe is None else probe
+        self.cache: Dict[Tuple[int, int], int] = {}
+        self.rows: Dict[int, Optional[Tuple[int, int]]] = {}
+        # rows past the origin known to hold the beam, sorted, to find the nearest one
+        self.known: List[int] = []
+
+    def pulled(self, x: int, y: int) -> int:
+        if y < 0:
+            return 0
+        r = self.cache.get((x, y))
+        if r is None:
+            r = self.cache[x, y] = self.probe(x, y)
+        return r
+
+    def edges(self, x: int) -> Optional[Tuple[int, int]]:
+        """(lo, hi) of row x, or None when the row misses the beam (it can near the origin)."""
+        if x in self.rows:
+            return self.rows[x]
+
+        index = bisect.bisect(self.known, x)
+        if self.known:
+            rx = self.known[max(index - 1, 0)]
+            rlo, rhi = self.rows[rx]
+            guess_lo, guess_hi = rlo * x // rx, -(-rhi * x // rx)
+            reach = max(10, abs(x - rx))
+        else:
+            guess_lo = guess_hi = 0
+            reach = 10 * x + 10
+
+        # find any cell of the row in the beam, closest to where lo should be
+        for distance in range(reach + 1):
+            if self.pulled(x, guess_lo + distance):
+                y = guess_lo + distance
                 break
+            if distance and self.pulled(x, guess_lo - distance):
+                y = guess_lo - distance
+                break
+        else:
+            self.rows[x] = None
+            return None
+
+        lo = y
+        while self.pulled(x, lo - 1):
+            lo -= 1
+
+        hi = max(lo, guess_hi)
+        if self.pulled(x, hi):
+            while self.pulled(x, hi + 1):
+                hi += 1
+        else:
+            while not self.pulled(x, hi):
+                hi -= 1
+
+        self.rows[x] = lo, hi
+        if x:
+            bisect.insort(self.known, x)
+        return lo, hi
+
+    def fits(self, x: int, size: int) -> bool:
+        """Does a size x size square end on row x, starting at that row's lo edge?"""
+        if x < size - 1:
+            return False
+        bottom, top = self.edges(x), self.edges(x - size + 1)
+        if bottom is None or top is None:
+            return False
+        lo = bottom[0]
+        return bottom[1] >= lo + size - 1 and top[0] <= lo and top[1] >= lo + size - 1
+
+    def follow(self, rows: int) -> None:
+        """Walk the edges row by row from the origin; the slope estimates come from here."""
+        for x in range(1, rows):
+            self.edges(x)
+
+    def square(self, size: int) -> Tuple[int, int]:
+        """The (x, y) of the square's corner closest to the emitter."""
+        self.follow(size)
+
+        # gallop up to a row the square fits on, then binary search the first one
+        failed, x = size - 2, size - 1
+        while not self.fits(x, size):
+            failed, x = x, max(x * 2, 1)
+        while x - failed > 1:
+            middle = (failed + x) // 2
+            if self.fits(middle, size):
+                x = middle
+            else:
+                failed = middle
+
+        # fitting is not perfectly monotonic on a grid; look just below the result
+        for candidate in range(x - 1, max(x - size, size - 2), -1):
+            if self.fits(candidate, size):
+                x = candidate
+
+        return x - size + 1, self.edges(x)[0]
 
 
 def reddit_fast_answer_for_part_2():
@@ -62,15 +170,55 @@ def reddit_fast_answer_for_part_2():
     print(x * 10000 + y)
 
 
+def brute_force(grid: np.ndarray, size: int) -> Optional[Tuple[int, int]]:
+    """The first square found scanning a probed grid top to bottom, left to right."""
+    rows, cols = grid.shape
+    for x in range(rows - size + 1):
+        for y in range(cols - size + 1):
+            if grid[x : x + size, y : y + size].all():
+                return x, y
+    return None
+
+
+def tests():
+    # the origin is a square of one on its own
+    assert Beam().square(1) == (0, 0)
+    points = [(x, y) for x in range(90) for y in range(120)]
+    grid = probe(points).reshape(90, 120)
+    for size in range(2, 9):
+        assert Beam().square(size) == brute_force(grid, size)
+
+    # split into batches of 1000 lanes, the grid is the same
+    cells = 2000 * len(parse_instructions(r"./data/day_19.txt"))
+    assert (probe(points, max_cells=cells) == grid.ravel()).all()
+
+    # each lane stores 7 at the address it is given and outputs it; the lane with a far
+    # address finishes on a scalar machine instead of widening all of them
+    program = [3, 5, 1101, 7, 0, 0, 3, 9, 4, 0, 99]
+    addresses = [20 + lane for lane in range(11)] + [250_000_000]
+    m = LaneMachine(program, lanes=len(addresses)).feed([[a, a] for a in addresses])
+    m.run()
+    assert m.outputs[:, 0].tolist() == [7] * len(addresses)
+    assert m.memory.shape[1] < 100
+
+    # values wrap at 64 bits whether lanes step together or finish on a scalar machine
+    square = [1102, 4294967296, 4294967296, 7, 4, 7, 99, 0]
+    for lanes in (1, 16):
+        m = LaneMachine(square, lanes=lanes)
+        m.run()
+        assert m.outputs[:, 0].tolist() == [0] * lanes
+
+
 def run():
     # part1
     result = iterate(50, silent=True)
     assert result == 154
 
     # Part2
-    result = iterate2(840, 3000, 1_200, 2_000)
-    assert result == 9791328  # 9470649 too low
+    x, y = Beam().square(100)
+    assert x * 10_000 + y == 9791328  # 9470649 too low
 
 
 if __name__ == "__main__":
+    tests()
     run()
@@ -2,6 +2,9 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Dict, List, Tuple, Optional, Any
 from collections import deque, namedtuple
+from heapq import heappop, heappush
+
+import grid
 
 Cell = namedtuple("Cell", "row, col, level, last_portal")
 
@@ -12,6 +15,11 @@ class Donut:
         self.rows = len(self.maze)
         self.cols = len(self.maze[0])
         self.portals = dict()
+        # portal cell -> (the cell it leads to, the level change going through it)
+        self.teleports: Dict[Tuple[int, int], Tuple[Tuple[int, int], int]] = {}
+        self.names: Dict[Tuple[int, int], Tuple] = {}
+        self.outer: List[List[bool]] = []
+        self.entry_or_exit: List[List[bool]] = []
 
         self.populate_portals()
 
@@ -64,6 +72,20 @@ class Donut:
 
         self.portals = portals_new
 
+        self.outer = [
+            [row <= 2 or row >= self.rows - 4 or col <= 2 or col >= self.cols - 4 for col in range(self.cols)]
+            for row in range(self.rows)
+        ]
+        self.entry_or_exit = [[False] * self.cols for _ in range(self.rows)]
+        for key, cells in self.portals.items():
+            for a in cells:
+                self.names[a] = key
+                if key in (("A", "A"), ("Z", "Z")):
+                    self.entry_or_exit[a[0]][a[1]] = True
+                for b in cells:
+                    if a != b:
+                        self.teleports[a] = b, -1 if self.outer[a[0]][a[1]] else 1
+
     def goal(self, pos):
         return pos in self.portals[("Z", "Z")]
 
@@ -88,26 +110,18 @@ class Donut:
 
                 elif icon.isalpha():
                     # we should not add a neighbor if level = 0 and we are jumping from an outer portal
-                    for k, v in self.portals.items():
-                        if (cell.row, cell.col) in v:
-                            for a in v:
-                                if a != (cell.row, cell.col):
-                                    jump = (
-                                        1
-                                        if a[0] in (2, self.rows - 3)
-                                        or a[1] in (2, self.cols - 4)
-                                        else -1
-                                    )
-
-                                    c = Cell(
-                                        row=a[0],
-                                        col=a[1],
-                                        level=cell.level + jump,
-                                        last_portal=k,
-                                    )
-
-                                    if c.level >= 0:
-                                        neighbors.append(c)
+                    teleport = self.teleports.get((cell.row, cell.col))
+                    if teleport is not None:
+                        (r, c), jump = teleport
+                        if cell.level + jump >= 0:
+                            neighbors.append(
+                                Cell(
+                                    row=r,
+                                    col=c,
+                                    level=cell.level + jump,
+                                    last_portal=self.names[(cell.row, cell.col)],
+                                )
+                            )
 
                     neighbors.append(
                         Cell(
@@ -121,45 +135,33 @@ class Donut:
         return neighbors
 
     def is_entry_or_exit(self, cell):
-        row, col = cell[0], cell[1]
-        for k, v in self.portals.items():
-            if (row, col) in v:
-                if k == ("Z", "Z") or k == ("A", "A"):
-                    return True
-        return False
-
-    def neighbors(self, pos):
-        neighbors = []
-        row1, col1 = pos
-        for (row2, col2) in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-            row: int = row1 + row2
-            col: int = col1 + col2
-            if 0 <= row < self.rows and 0 <= col <= self.cols:
-                icon = self.maze[row][col]
-
-                if icon == ".":
-                    neighbors.append((row, col))
-                elif icon.isalpha():
-                    for v in self.portals.values():
-                        if (row1, col1) in v:
-                            for a in v:
-                                if a != (row1, col1) or a[0] != row1 or a[1] != col1:
-                                    neighbors.append((a[0], a[1]))
-                    neighbors.append((row, col))
-
-        return neighbors
+        return self.entry_or_exit[cell[0]][cell[1]]
+
+    def compile(self) -> grid.Grid:
+        # walking onto a portal's letter and out of its partner is a single step
+        links = [(a, b, 1) for a, (b, _) in self.teleports.items()]
+        return grid.Grid(self.maze, passable=lambda icon: icon == ".", links=links)
+
+    def portal_graph(self) -> Dict[Tuple[int, int], List[Tuple[Tuple[int, int], int]]]:
+        """Walking steps from each portal cell to every other portal cell it reaches."""
+        g = grid.Grid(self.maze, passable=lambda icon: icon == ".")
+        ends = [cell for cells in self.portals.values() for cell in cells]
+
+        graph = {}
+        for cell in ends:
+            reached = grid.distances(g, g.node(*cell))
+            graph[cell] = [
+                (other, reached[g.node(*other)])
+                for other in ends
+                if other != cell and g.node(*other) in reached
+            ]
+        return graph
 
     def get_starting_position(self):
         return self.portals[("A", "A")][0]
 
     def is_outer(self, pos):
-        r1, c1 = pos[0], pos[1]
-        if 0 <= r1 <= 2 or self.rows - 4 <= r1 < self.rows:
-            return True
-        if 0 <= c1 <= 2 or self.cols - 4 <= c1 < self.cols:
-            return True
-
-        return False
+        return self.outer[pos[0]][pos[1]]
 
 
 def prep_data(path):
@@ -177,25 +179,6 @@ class Node:
     steps: int
 
 
-def bfs(donut, current_position):
-    frontier = deque([Node(current_position, None, 0)])
-    visited = set(current_position)
-
-    while frontier:
-        node = frontier.popleft()
-        pos = node.state
-
-        if donut.goal(pos) is True:
-            return node
-
-        for neighbor in donut.neighbors(pos):
-            if neighbor not in visited:
-                visited.add(neighbor)
-                inc = 0 if donut.maze[neighbor[0]][neighbor[1]].isalpha() else 1
-
-                frontier.append(Node(neighbor, node, node.steps + inc))
-
-
 def bfs2(donut, pos):
     c = Cell(row=pos[0], col=pos[1], level=0, last_portal="")
     frontier = deque([Node(c, None, 0)])
@@ -214,12 +197,71 @@ def bfs2(donut, pos):
                 frontier.append(Node(cell, node, node.steps + inc))
 
 
+def depth_bound(donut) -> int:
+    """
+    No shortest way out goes deeper than m * m levels, for m pairs of portals.
+
+    Say the deepest level H is reached at time t.  For each h < H, take the last
+    inward jump from h before t (through inner portal p) and the first outward jump
+    back to h after t (through outer portal q).  Past m * m levels two of them, h < h',
+    share both p and q.  Cut the walk from the jump at h to the jump at h', and from
+    the jump back to h' to the jump back to h, then shift what lies between down by
+    h' - h.  That part never went below h', so it stays at h or deeper and never uses
+    the exit.  The result is a shorter way out, because every jump costs a step.
+    """
+    pairs = len(donut.portals) - 2  # AA and ZZ are not portals
+    return pairs * pairs
+
+
+def dijkstra2(donut, pos) -> Optional[int]:
+    """
+    Part 2 as Dijkstra over (portal cell, level) on the portal graph: walk to a portal
+    cell, then step through it to the level Donut.teleports gives.  The exit only
+    counts on level 0.  Levels past depth_bound are never needed, so the search ends,
+    and None means there is no way out.
+    """
+    graph = donut.portal_graph()
+    exit_ = donut.portals[("Z", "Z")][0]
+    deepest = depth_bound(donut)
+
+    best = {(pos, 0): 0}
+    frontier = [(0, pos, 0)]
+    while frontier:
+        steps, cell, level = heappop(frontier)
+        if cell == exit_:
+            return steps
+        if best[(cell, level)] < steps:
+            continue
+
+        for other, distance in graph[cell]:
+            if other == exit_:
+                if level != 0:
+                    continue
+                state, cost = (other, level), steps + distance
+            elif other in donut.teleports:
+                partner, jump = donut.teleports[other]
+                if not 0 <= level + jump <= deepest:
+                    continue
+                state, cost = (partner, level + jump), steps + distance + 1
+            else:
+                continue  # the entrance
+
+            if cost < best.get(state, cost + 1):
+                best[state] = cost
+                heappush(frontier, (cost, *state))
+
+    return None
+
+
 def get_steps(instructions, part2=False):
     d = Donut(instructions, part2=part2)
     p = d.get_starting_position()
-    r = bfs2(d, p) if part2 is True else bfs(d, p)
+    if part2 is True:
+        return dijkstra2(d, p)
 
-    return r.steps
+    g = d.compile()
+    goal = g.node(*d.portals[("Z", "Z")][0])
+    return grid.bfs(g, g.node(*p), lambda node: node == goal)
 
 
 def trace_back(node):
@@ -240,6 +282,15 @@ def test():
     t3 = prep_data(r"./data/day_20_test3.txt")
     results = get_steps(t3, part2=True)
     assert results == 396
+    # the cell by cell search agrees
+    d = Donut(t3, part2=True)
+    assert bfs2(d, d.get_starting_position()).steps == 396
+
+    # the second example has no way out on recursive levels
+    assert get_steps(t2, part2=True) is None
+
+    results = get_steps(t1, part2=True)
+    assert results == 26
 
 
 def run():
@@ -1,4 +1,4 @@
-from day_09 import IntCodeMachine, parse_instructions
+from intcode import IntCodeMachine, parse_instructions
 
 
 class SpringScript:
@@ -20,18 +20,11 @@ class SpringScript:
         o3 = ['T', 'J']
 
     def input_instruction(self, cmd):
-        for c in list(cmd):
-            self.m.input(ord(c))
-        self.m.input(10)
+        self.m.feed(cmd + "\n")
 
     def run(self):
-        self.m.input(ord("W")).input(ord("A")).input(ord("L")).input(ord("K")).input(10)
-        while True:
-            results = self.m.op_codes()
-            if results:
-                print(chr(results[1]), end="")
-            else:
-                break
+        self.m.feed("WALK\n")
+        print(self.m.run_ascii(), end="")
 
 
 if __name__ == "__main__":
@@ -1,7 +1,8 @@
-from collections import deque, defaultdict
-from typing import Dict, List, Optional, Tuple
+from typing import List, Optional, Tuple, Union
 
-from day_09 import IntCodeMachine, parse_instructions
+from intcode import IntCodeMachine, Network, parse_instructions
+from intcode.network import Packet
+from intcode.sharding import ShardedNetwork
 
 
 class Nat:
@@ -28,59 +29,34 @@ class Nat:
         return self._count == 2
 
 
-q: Dict[int, deque[int]] = defaultdict(deque)
-
+def start_network(network: Union[Network, ShardedNetwork], nat: Nat) -> None:
+    while True:
+        for address, x, y in network.run_until_idle():
+            if address == 255:
+                nat.signal = (x, y)
 
-class XMasError(BaseException):
-    pass
+        # all machines are idle; the NAT wakes up machine 0
+        a, b = nat.signal
+        network.send(0, a, b)
+        if nat.is_second_use():
+            return
 
 
-def start_network(machines: List[IntCodeMachine], nat: Nat) -> None:
-    keys = set()
-    while True:
-        # Fill up the machines
-        for key in q.keys():
-
-            m = machines[key]
-            while q[key]:
-                nat.idles = 0  # not idle; accepting input
-                keys.add(key)
-                m.input(q[key].popleft())
-
-        for key in range(50):
-            m = machines[key]
-            buffer: List[int] = []
-            while True:
-                try:
-                    m.op_codes()
-                    if m.buffer is not None:
-                        nat.idles = 0  # reset buffer -- not idle
-                        buffer.append(int(m.buffer))
-                    if len(buffer) == 3:
-                        if buffer[0] == 255:
-                            nat.signal = (buffer[1], buffer[2])
-                        else:
-                            q[buffer[0]].append(buffer[1])
-                            q[buffer[0]].append(buffer[2])
-                        buffer.clear()
-
-                except (IndexError, RuntimeError) as e:
-                    m.input(-1)
-                    nat.idles += 1  # likely should only add if q is empty .. but meh.
-
-                    if nat.idles == 100:  # all items are idle
-                        a, b = nat.signal
-                        machines[0].input(a)
-                        machines[0].input(b)
-                        if nat.is_second_use():
-                            raise XMasError("All criteria met.")
-                        nat.idles = 0
-                    break
-        keys.clear()
-
-
-def run() -> None:
+def idle_periods(network: Union[Network, ShardedNetwork], periods: int) -> List[List[Packet]]:
+    """The packets that leave the network in each idle period, the NAT waking 0 in between."""
     nat = Nat()
+    result = []
+    for _ in range(periods):
+        external = network.run_until_idle()
+        result.append(external)
+        for address, x, y in external:
+            if address == 255:
+                nat.signal = (x, y)
+        network.send(0, *nat.signal)
+    return result
+
+
+def get_machines() -> List[IntCodeMachine]:
     instructions = parse_instructions("./data/day_23.txt")
 
     machines = []
@@ -88,14 +64,39 @@ def run() -> None:
         m = IntCodeMachine(instructions, silent=True)
         m.input(x)  # providing the network address 0-49
         machines.append(m)
-    q[0].append(-1)
+    return machines
+
 
-    try:
-        start_network(machines, nat)
-    except XMasError as _:
-        assert nat.part01 == 17283
-        assert nat.signal[1] == 11319
+def tests() -> None:
+    # every packet of every idle period, not only the answers, is the same when sharded
+    expected = idle_periods(Network(get_machines()), 6)
+    for workers in (1, 4):
+        with ShardedNetwork(get_machines(), workers) as network:
+            assert idle_periods(network, 6) == expected
+
+
+def run(workers: int = 0) -> Union[Network, ShardedNetwork]:
+    """With workers, the machines are sharded over that many processes."""
+    nat = Nat()
+    machines = get_machines()
+    if workers:
+        with ShardedNetwork(machines, workers) as network:
+            start_network(network, nat)
+    else:
+        network = Network(machines)
+        start_network(network, nat)
+    assert nat.part01 == 17283
+    assert nat.signal[1] == 11319
+    return network
 
 
 if __name__ == "__main__":
-    run()
+    tests()
+    for workers in (0, 4):
+        network = run(workers)
+        print(
+            f"workers={workers}: {network.packets} packets in {network.runs} machine runs, "
+            f"{network.throughput:.0f} packets/s"
+        )
+        if workers:
+            print(f"\t{network.waves} waves, {network.redos} steps run again")
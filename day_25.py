@@ -4,15 +4,13 @@ import re
 from random import choices
 from typing import List, Dict
 
-from day_09 import IntCodeMachine, parse_instructions
+from intcode import IntCodeMachine, parse_instructions
 
 ShipData = Dict[str, List[str]]
 
 
 def _add_input(m: IntCodeMachine, message: str) -> None:
-    for i in message:
-        m.input(ord(i))
-    m.input(10)
+    m.feed(message + "\n")
 
 
 def load_spin() -> None:
@@ -32,37 +30,33 @@ def load_spin() -> None:
         "manifold",
     ]
 
+    if os.path.isfile("day_25.save"):
+        m.load("day_25.save")
+    checkpoint = m.snapshot()
+
     for i in range(1, len(_items) + 1):
         y = itertools.combinations(_items, i)
 
-        buffer = ""
         for _things in y:
-            if os.path.isfile("day_25.save"):
-                m.load("day_25.save")
+            m.restore(checkpoint)
 
             for thing in _things:
                 _add_input(m, "drop " + thing)
             _add_input(m, "inv")
             _add_input(m, "north")
 
+            # stops early when the inputs run out, which is expected for this loop to keep
+            # trying all combinations.
             try:
-
-                for x in range(101500):
-                    m.op_codes()
-                    if isinstance(m.buffer, int):
-                        buffer += chr(m.buffer)
-
-                    if "Command?" in buffer:
-                        buffer = ""
+                buffer = m.run_ascii(outputs=101500)
             except RuntimeError as _:
-                # Will get hit if we run out of inputs which is expected for this loop to keep trying
-                # all combinations.
-                pass
+                # Will get hit when there was no save to load and the bogus codes run.
+                continue
 
-            except KeyError as _:
+            if m.halted:
                 # Natural end to the program...
                 pattern = re.compile(r"\d+")
-                results = re.findall(pattern, buffer)
+                results = re.findall(pattern, buffer.split("Command?")[-1])
                 assert results[0] == "537002052"
                 return
 
@@ -109,7 +103,7 @@ def spin(m: IntCodeMachine) -> bool:
                     continue
 
                 if all_items and title[0] == "== Security Checkpoint ==":
-                    m.save()
+                    m.save("day_25.save")
                     return True
 
                 for choice in rooms[title[0]]:
@@ -0,0 +1,181 @@
+"""
+Character grids compiled once for the maze searches (day_15, day_17, day_18, day_20).
+
+Cell (row, col) is node (row - origin row) * cols + (col - origin col), and the
+neighbours of the open cells are kept CSR style: the neighbours of node n are
+targets[offsets[n]:offsets[n + 1]] and weights holds the cost of each of those edges.
+Searches then run over plain ints instead of building tuples for every step.  Extra
+edges that are not grid steps (day_20's portals) are given as links.
+"""
+
+from array import array
+from collections import deque
+from heapq import heappop, heappush
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+Position = Tuple[int, int]
+Link = Tuple[Position, Position, int]
+
+# clockwise from up, as (row, col) steps
+DIRECTIONS = ((-1, 0), (0, 1), (1, 0), (0, -1))
+
+
+def not_wall(icon: str) -> bool:
+    return icon != "#"
+
+
+class Grid:
+    def __init__(
+        self,
+        lines: Sequence[Sequence[str]],
+        passable: Callable[[str], bool] = not_wall,
+        links: Iterable[Link] = (),
+        origin: Position = (0, 0),
+    ):
+        self.rows = len(lines)
+        self.cols = max(len(line) for line in lines)
+        self.origin = origin
+        # ragged lines are padded with blanks
+        self.cells: List[str] = [
+            line[col] if col < len(line) else " " for line in lines for col in range(self.cols)
+        ]
+        self.open: List[bool] = [passable(icon) for icon in self.cells]
+
+        extra: Dict[int, List[Tuple[int, int]]] = {}
+        for source, target, weight in links:
+            extra.setdefault(self.node(*source), []).append((self.node(*target), weight))
+
+        self.offsets = array("l", [0])
+        self.targets = array("l")
+        self.weights = array("l")
+        for node in range(len(self.cells)):
+            if self.open[node]:
+                for step in self.steps(node):
+                    self.targets.append(step)
+                    self.weights.append(1)
+                for target, weight in extra.get(node, ()):
+                    self.targets.append(target)
+                    self.weights.append(weight)
+            self.offsets.append(len(self.targets))
+
+    @classmethod
+    def from_map(cls, mapping: Mapping[Position, str], blank: str = "#", **kwargs) -> "Grid":
+        """A grid from a sparse {(row, col): icon} map; cells not in the map are blank."""
+        rows = [row for row, _ in mapping]
+        cols = [col for _, col in mapping]
+        top, left = min(rows), min(cols)
+        lines = [
+            [mapping.get((row, col), blank) for col in range(left, max(cols) + 1)]
+            for row in range(top, max(rows) + 1)
+        ]
+        return cls(lines, origin=(top, left), **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    def node(self, row: int, col: int) -> int:
+        return (row - self.origin[0]) * self.cols + col - self.origin[1]
+
+    def position(self, node: int) -> Position:
+        row, col = divmod(node, self.cols)
+        return row + self.origin[0], col + self.origin[1]
+
+    def find(self, icon: str) -> List[int]:
+        return [node for node, cell in enumerate(self.cells) if cell == icon]
+
+    def toward(self, node: int, direction: int) -> int:
+        """The open node one step in DIRECTIONS[direction] from node, else -1."""
+        row, col = divmod(node, self.cols)
+        row += DIRECTIONS[direction][0]
+        col += DIRECTIONS[direction][1]
+        if 0 <= row < self.rows and 0 <= col < self.cols:
+            target = row * self.cols + col
+            if self.open[target]:
+                return target
+        return -1
+
+    def steps(self, node: int) -> List[int]:
+        return [target for target in (self.toward(node, d) for d in range(4)) if target >= 0]
+
+    def neighbors(self, node: int) -> Sequence[int]:
+        return self.targets[self.offsets[node] : self.offsets[node + 1]]
+
+    def degree(self, node: int) -> int:
+        return self.offsets[node + 1] - self.offsets[node]
+
+    def manhattan(self, goal: int) -> Callable[[int], int]:
+        goal_row, goal_col = divmod(goal, self.cols)
+
+        def distance(node: int) -> int:
+            row, col = divmod(node, self.cols)
+            return abs(row - goal_row) + abs(col - goal_col)
+
+        return distance
+
+
+def distances(grid: Grid, start: int, through: Optional[Callable[[int], bool]] = None) -> Dict[int, int]:
+    """
+    Unit step BFS distances from start to every node it reaches (link weights are
+    ignored).  A node that fails `through` is reached but not searched past.
+    """
+    offsets, targets = grid.offsets, grid.targets
+    seen = {start: 0}
+    frontier = deque([start])
+    while frontier:
+        node = frontier.popleft()
+        if through is not None and node != start and not through(node):
+            continue
+        steps = seen[node] + 1
+        for i in range(offsets[node], offsets[node + 1]):
+            target = targets[i]
+            if target not in seen:
+                seen[target] = steps
+                frontier.append(target)
+    return seen
+
+
+def bfs(grid: Grid, start: int, goal: Callable[[int], bool]) -> Optional[int]:
+    """Unit steps from start to the nearest node passing goal, or None."""
+    offsets, targets = grid.offsets, grid.targets
+    seen = {start}
+    frontier = [start]
+    steps = 0
+    while frontier:
+        following = []
+        for node in frontier:
+            if goal(node):
+                return steps
+            for i in range(offsets[node], offsets[node + 1]):
+                target = targets[i]
+                if target not in seen:
+                    seen.add(target)
+                    following.append(target)
+        frontier = following
+        steps += 1
+    return None
+
+
+def astar(grid: Grid, start: int, goal: int, heuristic: Optional[Callable[[int], int]] = None) -> Optional[int]:
+    """Cost of the cheapest weighted path from start to goal, or None."""
+    heuristic = grid.manhattan(goal) if heuristic is None else heuristic
+    offsets, targets, weights = grid.offsets, grid.targets, grid.weights
+    costs = {start: 0}
+    frontier = [(heuristic(start), 0, start)]
+    while frontier:
+        _, cost, node = heappop(frontier)
+        if node == goal:
+            return cost
+        if cost > costs[node]:
+            continue
+        for i in range(offsets[node], offsets[node + 1]):
+            target = targets[i]
+            new_cost = cost + weights[i]
+            if new_cost < costs.get(target, new_cost + 1):
+                costs[target] = new_cost
+                heappush(frontier, (new_cost + heuristic(target), new_cost, target))
+    return None
+
+
+def dijkstra(grid: Grid, start: int, goal: int) -> Optional[int]:
+    """astar without a heuristic, for grids whose links break the manhattan bound."""
+    return astar(grid, start, goal, heuristic=lambda node: 0)
@@ -0,0 +1,42 @@
+"""
+The one Intcode VM shared by every day that runs an Intcode program.
+
+- IntCodeMachine: memory, decode cache and the interpreted/compiled/profiled engines
+- Snapshot: a machine's complete state for restore(); see also IntCodeMachine.fork
+- checkpoint: the binary file format behind IntCodeMachine.save/load
+- InputChannel: the deque-backed input queue (bulk feed, source iterator, blocking)
+- Profile: per address/opcode counts, family timings and branch ratios (telemetry_flag)
+- Policy: how op_codes hands control back (run-to-halt, yield-on-output, block-on-input)
+- BlockCompiler: straight-line blocks compiled to Python for op_codes_compiled
+- PagedMemory: sparse memory of fixed size array('q') pages
+- Network: cooperative scheduler for machines exchanging (address, x, y) packets
+- parse_instructions: load a comma separated program from ./data
+
+Two more are imported from their own modules by the days that use them, so the rest
+only need the standard library:
+
+- intcode.lanes.LaneMachine: one program over many NumPy lanes at once (needs NumPy)
+- intcode.sharding.ShardedNetwork: a Network split over worker processes and shared
+  memory rings
+"""
+
+from intcode.channel import InputChannel
+from intcode.compiler import BlockCompiler
+from intcode.machine import IntCodeMachine, Policy
+from intcode.memory import PagedMemory
+from intcode.network import Network
+from intcode.profiler import Profile
+from intcode.programs import parse_instructions
+from intcode.snapshot import Snapshot
+
+__all__ = [
+    "BlockCompiler",
+    "InputChannel",
+    "IntCodeMachine",
+    "Network",
+    "PagedMemory",
+    "Policy",
+    "Profile",
+    "Snapshot",
+    "parse_instructions",
+]
@@ -0,0 +1,70 @@
+from collections import deque
+from threading import Condition
+from typing import Iterable, Iterator, Optional, Union
+
+
+class InputChannel:
+    """
+    The values an IntCodeMachine reads with opcode 3.
+
+    Values are queued in a deque, so taking one is O(1) however much text has been fed.
+    When the queue is empty the channel falls back to `source` (any iterator, e.g. a
+    generator producing joystick positions), and in blocking mode it waits until
+    another thread feeds it.  Otherwise the machine is starved and its Policy decides
+    what happens next.
+    """
+
+    def __init__(
+        self,
+        values: Iterable[int] = (),
+        source: Optional[Iterator[int]] = None,
+        blocking: bool = False,
+        timeout: Optional[float] = None,
+    ):
+        self.queue = deque(values)
+        self.source = source
+        self.blocking = blocking
+        self.timeout = timeout
+        self.fed = Condition()
+
+    def __len__(self) -> int:
+        return len(self.queue)
+
+    def __bool__(self) -> bool:
+        return bool(self.queue)
+
+    def __repr__(self) -> str:
+        return f"InputChannel({list(self.queue)!r}, source={self.source!r}, blocking={self.blocking})"
+
+    def put(self, value: int) -> "InputChannel":
+        with self.fed:
+            self.queue.append(value)
+            self.fed.notify()
+        return self
+
+    def feed(self, data: Union[bytes, str, Iterable[int]]) -> "InputChannel":
+        """Queue many values at once; text is queued as its character codes."""
+        if isinstance(data, str):
+            data = data.encode("ascii")
+        with self.fed:
+            self.queue.extend(data)
+            self.fed.notify()
+        return self
+
+    def starved(self) -> bool:
+        """True when get() has nothing to return and would not wait for anything."""
+        return not self.queue and self.source is None and not self.blocking
+
+    def get(self) -> int:
+        if self.queue:
+            return self.queue.popleft()
+        if self.source is not None:
+            return next(self.source)
+        with self.fed:
+            if not self.fed.wait_for(lambda: self.queue, self.timeout):
+                raise RuntimeError(f"Expected input within {self.timeout}s, but nothing was fed")
+            return self.queue.popleft()
+
+    def copy(self) -> "InputChannel":
+        """Same queued values and settings; a source iterator is shared, not copied."""
+        return InputChannel(self.queue, self.source, self.blocking, self.timeout)
@@ -0,0 +1,169 @@
+"""
+Binary checkpoints of a complete IntCodeMachine state.
+
+Layout (little endian):
+
+    header   magic b"ICKP", version (H), flags (H), pointer (q), relative_base (q),
+             policy (B), silent (B)
+    body     optionally zlib compressed (flags & COMPRESSED), a run of int sections:
+             buffer, inputs, telemetry (address/count pairs), then one section per
+             memory page preceded by its page number (q)
+
+Every int section is a kind (B), a count (I) and a payload size (I).  Kind 0 is a
+packed array('q'); kind 1 is comma separated decimal for the rare section holding a
+value outside of 64 bits.  Nothing is ever passed to eval.
+"""
+
+import mmap
+import struct
+import traceback
+import zlib
+from array import array
+from typing import Dict, List, Optional, Tuple, Union
+
+from intcode.memory import PAGE_SIZE, PagedMemory
+from intcode.snapshot import Snapshot
+
+MAGIC = b"ICKP"
+VERSION = 1
+COMPRESSED = 1
+
+HEADER = struct.Struct("<4sHHqqBB")
+SECTION = struct.Struct("<BII")
+PAGE_NUMBER = struct.Struct("<q")
+
+
+def pack_ints(values) -> bytes:
+    try:
+        payload = array("q", values).tobytes()
+        kind = 0
+    except OverflowError:
+        payload = ",".join(str(v) for v in values).encode("ascii")
+        kind = 1
+    return SECTION.pack(kind, len(values), len(payload)) + payload
+
+
+def unpack_ints(data, offset: int) -> Tuple[Union[array, List[int]], int]:
+    kind, count, size = SECTION.unpack_from(data, offset)
+    offset += SECTION.size
+    if offset + size > len(data):
+        raise ValueError(
+            f"Expected a {size} byte section at {offset}, but the checkpoint ends at {len(data)}"
+        )
+    payload = data[offset : offset + size]
+    if kind == 0:
+        values = array("q")
+        if size % values.itemsize:
+            raise ValueError(
+                f"Expected whole 64 bit values in the section at {offset}, but got {size} bytes"
+            )
+        values.frombytes(payload)
+    elif kind == 1:
+        values = [int(v) for v in bytes(payload).split(b",")] if count else []
+    else:
+        raise ValueError(f"Expected a section of kind 0 or 1 at {offset}, but got {kind}")
+    if len(values) != count:
+        raise ValueError(
+            f"Expected {count} values in the section at {offset}, but got {len(values)}"
+        )
+    return values, offset + size
+
+
+def dumps(snapshot: Snapshot, policy: int, silent: bool, compress: bool = True) -> bytes:
+    """Serialize a Snapshot plus the machine's policy and silent flag."""
+    body = [
+        pack_ints([] if snapshot.buffer is None else [snapshot.buffer]),
+        pack_ints(snapshot.inputs),
+        pack_ints([v for item in snapshot.telemetry.items() for v in item]),
+    ]
+    for number, page in sorted(snapshot.memory.pages.items()):
+        body.append(PAGE_NUMBER.pack(number))
+        body.append(pack_ints(page))
+
+    payload = b"".join(body)
+    if compress:
+        payload = zlib.compress(payload)
+
+    header = HEADER.pack(
+        MAGIC,
+        VERSION,
+        COMPRESSED if compress else 0,
+        snapshot.pointer,
+        snapshot.relative_base,
+        policy,
+        silent,
+    )
+    return header + payload
+
+
+def loads(data) -> Tuple[Snapshot, int, bool]:
+    """
+    The inverse of dumps: (snapshot, policy, silent).  `data` may be a memoryview.  A
+    truncated or corrupt checkpoint raises a ValueError.
+    """
+    try:
+        return parse(data)
+    except (struct.error, zlib.error) as error:
+        raise ValueError(
+            f"Expected a complete Intcode checkpoint, but it is corrupt: {error}"
+        ) from error
+
+
+def parse(data) -> Tuple[Snapshot, int, bool]:
+    magic, version, flags, pointer, relative_base, policy, silent = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError(f"Expected an Intcode checkpoint, but the file starts with {magic!r}")
+    if version != VERSION:
+        raise ValueError(f"Expected checkpoint version {VERSION}, but got {version}")
+
+    body = data[HEADER.size :]
+    if flags & COMPRESSED:
+        body = memoryview(zlib.decompress(body))
+
+    buffer, offset = unpack_ints(body, 0)
+    inputs, offset = unpack_ints(body, offset)
+    pairs, offset = unpack_ints(body, offset)
+    telemetry: Dict[int, int] = dict(zip(pairs[::2], pairs[1::2]))
+
+    memory = PagedMemory()
+    while offset < len(body):
+        (number,) = PAGE_NUMBER.unpack_from(body, offset)
+        cells, offset = unpack_ints(body, offset + PAGE_NUMBER.size)
+        if len(cells) != PAGE_SIZE:
+            raise ValueError(f"Expected {PAGE_SIZE} cells in page {number}, but got {len(cells)}")
+        if isinstance(cells, list):
+            # a page that had to hold a value outside 64 bits on the way out
+            try:
+                cells = array("q", cells)
+            except OverflowError:
+                pass
+        memory.pages[number] = memory.writable[number] = cells
+
+    snapshot = Snapshot(
+        memory=memory,
+        pointer=pointer,
+        relative_base=relative_base,
+        inputs=tuple(inputs),
+        buffer=buffer[0] if buffer else None,
+        telemetry=telemetry,
+    )
+    return snapshot, policy, bool(silent)
+
+
+def write(path: str, snapshot: Snapshot, policy: int, silent: bool, compress: bool = True) -> None:
+    with open(path, "wb") as file:
+        file.write(dumps(snapshot, policy, silent, compress))
+
+
+def read(path: str) -> Tuple[Snapshot, int, bool]:
+    """Load a checkpoint straight out of a read-only memory map of the file."""
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        try:
+            return loads(memoryview(data))
+        except Exception as error:
+            # views of the map left in the tracebacks would stop it from closing
+            cause: Optional[BaseException] = error
+            while cause is not None:
+                traceback.clear_frames(cause.__traceback__)
+                cause = cause.__cause__ or cause.__context__
+            raise
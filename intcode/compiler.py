@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, Dict, List, Set, Tuple
+
+from intcode.memory import PAGE_BITS, PAGE_MASK, ZERO_PAGE
+from intcode.profiler import NAMES
+
+if TYPE_CHECKING:
+    from intcode.machine import IntCodeMachine
+
+
+class BlockCompiler:
+    """
+    Compiles straight-line Intcode (runs of add, mul, less_than, equals and set_relative,
+    optionally closed by a jump) into one generated Python function per entry address.
+
+    A block function takes the machine, executes the whole run and returns the next
+    pointer.  Only the opcodes and modes are baked into the generated source; parameters
+    are still read from memory because Intcode programs routinely store variables in
+    their own instruction operands.  The opcode cells are registered in `owners` and
+    IntCodeMachine.memory_write drops the block as soon as one of them is written.  A
+    block that rewrites one of its own later opcodes returns early so the remainder is
+    recompiled from fresh memory.
+
+    `owners` also holds every address the machine has decoded (with no blocks), so a
+    block only has to call memory_write when it writes code; plain data is stored
+    straight into its page.
+
+    A fork shares `blocks` and `owners` with its parent until either one changes them
+    (see own), the same way PagedMemory shares pages.  Generated functions are keyed by
+    the scanned run and shared by every machine in the process, in an LRU cache of
+    `cached` runs so self-modifying programs and many loaded programs cannot grow it
+    without bound.
+    """
+
+    straight_line = {1, 2, 7, 8, 9}
+    jumps = {5, 6}
+    arity = {1: 3, 2: 3, 5: 2, 6: 2, 7: 3, 8: 3, 9: 1}
+    cached = 4096
+
+    def __init__(self, machine: IntCodeMachine):
+        self.machine = machine
+        self.blocks: Dict[int, Callable[[IntCodeMachine], int]] = {}
+        # opcode cell -> starts of the blocks that contain it
+        self.owners: Dict[int, Tuple[int, ...]] = {}
+        self.shared = False
+
+    def fork(self, machine: IntCodeMachine) -> BlockCompiler:
+        """Compiled blocks for a forked machine; its memory holds the same code."""
+        child = BlockCompiler(machine)
+        child.blocks = self.blocks
+        child.owners = self.owners
+        self.shared = child.shared = True
+        return child
+
+    def own(self) -> None:
+        """Take private copies of dicts still shared with a fork (the tuples are immutable)."""
+        self.blocks = dict(self.blocks)
+        self.owners = dict(self.owners)
+        self.shared = False
+
+    def watch(self, position: int) -> None:
+        """Register a decoded address, so writes to it go through memory_write."""
+        if position not in self.owners:
+            if self.shared:
+                self.own()
+            self.owners[position] = ()
+
+    def invalidate(self, position: int) -> None:
+        if position not in self.owners:
+            return
+        if self.shared:
+            self.own()
+        for start in self.owners.pop(position):
+            self.blocks.pop(start, None)
+
+    def forget(self, pages: Set[int]) -> None:
+        """
+        Drop the blocks that index one of `pages` directly, for a memory image without
+        them (an instruction's cells span at most the page of its opcode and the next).
+        """
+        starts = {
+            start
+            for position, owned in self.owners.items()
+            if position >> PAGE_BITS in pages or (position + 3) >> PAGE_BITS in pages
+            for start in owned
+        }
+        if starts and self.shared:
+            self.own()
+        for start in starts:
+            self.blocks.pop(start, None)
+
+    def scan(self, start: int) -> List[Tuple[int, int, Tuple[int, int, int]]]:
+        """Collect (pointer, op, modes) from start up to and including a jump."""
+        m = self.machine
+        memory = m.memory
+        run = []
+        pointer = start
+        while True:
+            op, modes = m.decode(memory.read(pointer))
+            if op not in self.straight_line and op not in self.jumps:
+                break
+            following = pointer + 1 + self.arity[op]
+            # make sure every operand page exists so the block can index it directly
+            memory.page(pointer >> PAGE_BITS)
+            memory.page((following - 1) >> PAGE_BITS)
+            run.append((pointer, op, modes))
+            pointer = following
+            if op in self.jumps:
+                break
+        return run
+
+    @staticmethod
+    def cell(position: int) -> str:
+        return f"pages[{position >> PAGE_BITS}][{position & PAGE_MASK}]"
+
+    @classmethod
+    def operand(cls, mode: int, cell: int, lines: List[str], tmp: str) -> str:
+        if mode == 1:
+            return cls.cell(cell)
+        if mode == 0:
+            lines.append(f"    {tmp} = {cls.cell(cell)}")
+        else:
+            lines.append(f"    {tmp} = rb + {cls.cell(cell)}")
+        return f"(get({tmp} >> {PAGE_BITS}, zero)[{tmp} & {PAGE_MASK}] if {tmp} >= 0 else read({tmp}))"
+
+    def compile(self, start: int) -> Callable[[IntCodeMachine], int]:
+        run = tuple(self.scan(start))
+        block = self.generate(run)
+
+        if self.shared:
+            self.own()
+        self.blocks[start] = block
+        for position, _, _ in run:
+            self.owners[position] = self.owners.get(position, ()) + (start,)
+        return block
+
+    @classmethod
+    @lru_cache(maxsize=cached)
+    def generate(cls, run: Tuple) -> Callable[[IntCodeMachine], int]:
+        opcode_cells = [pointer for pointer, _, _ in run]
+
+        lines = [
+            "def block(m):",
+            "    pages = m.memory.pages",
+            "    get = pages.get",
+            "    writable = m.memory.writable",
+            "    read = m.memory_read",
+            "    write = m.memory_write",
+            "    owners = m.compiler.owners",
+            "    rb = m.relative_base",
+        ]
+        returned = False
+        for index, (pointer, op, modes) in enumerate(run):
+            following = pointer + 1 + cls.arity[op]
+            lines.append(f"    # {pointer}: {NAMES[op]} {modes}")
+
+            a = cls.operand(modes[0], pointer + 1, lines, "ta")
+            if op == 9:
+                lines.append(f"    rb += {a}")
+                continue
+
+            b = cls.operand(modes[1], pointer + 2, lines, "tb")
+            if op in cls.jumps:
+                test = "!=" if op == 5 else "=="
+                lines.append("    m.relative_base = rb")
+                lines.append(f"    return {b} if {a} {test} 0 else {following}")
+                returned = True
+                break
+
+            if op == 1:
+                value = f"{a} + {b}"
+            elif op == 2:
+                value = f"{a} * {b}"
+            elif op == 7:
+                value = f"1 if {a} < {b} else 0"
+            else:
+                value = f"1 if {a} == {b} else 0"
+
+            target = cls.cell(pointer + 3)
+            lines.append(f"    tc = {'rb + ' if modes[2] == 2 else ''}{target}")
+            lines.append(f"    v = {value}")
+            lines.append("    if tc in owners:")
+            lines.append("        write(tc, v)")
+
+            later = opcode_cells[index + 1:]
+            if later:
+                lines.append(f"        if tc in {set(later)!r}:")
+                lines.append("            m.relative_base = rb")
+                lines.append(f"            return {following}")
+
+            # anything unusual (shared or unmapped page, negative address, >64 bit value)
+            # goes through write
+            lines.append("    else:")
+            lines.append("        try:")
+            lines.append(f"            writable[tc >> {PAGE_BITS}][tc & {PAGE_MASK}] = v")
+            lines.append("        except (KeyError, OverflowError):")
+            lines.append("            write(tc, v)")
+
+        if not returned:
+            lines.append("    m.relative_base = rb")
+            lines.append(f"    return {following}")
+
+        namespace: Dict[str, Callable] = {"zero": ZERO_PAGE}
+        exec("\n".join(lines), namespace)
+        return namespace["block"]
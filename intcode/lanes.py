@@ -0,0 +1,234 @@
+from typing import Sequence
+
+import numpy as np
+
+from intcode.machine import IntCodeMachine, Policy
+
+# the most cells a LaneMachine's (lanes, cells) memory may hold, 128 MiB of int64
+MAX_CELLS = 1 << 24
+
+
+def wrap(values) -> np.ndarray:
+    """Python ints as int64, wrapped at 64 bits the way the lanes' arithmetic wraps."""
+    return np.array([v & 0xFFFF_FFFF_FFFF_FFFF for v in values], dtype=np.uint64).view(np.int64)
+
+
+class TooWide(Exception):
+    """Lanes (rows) that need an address past LaneMachine.width_limit."""
+
+    def __init__(self, rows: np.ndarray):
+        super().__init__(f"Lanes {rows.tolist()} need addresses past the dense width")
+        self.rows = rows
+
+
+class LaneMachine:
+    """
+    One Intcode program run on many lanes at once, NumPy style: memory is a
+    (lanes, cells) int64 array, and pointer, relative_base, inputs and outputs are kept
+    per lane.  Lanes at the same pointer execute each instruction together with one
+    gather/scatter, so they may use different addresses (day_02's noun and verb are
+    addresses) and take different branches.
+
+    Lanes that diverge are grouped by pointer and every group takes one step per round;
+    a group smaller than `scalar_below` lanes is finished by an IntCodeMachine each
+    instead, since a NumPy step costs the same for one lane as for thousands.
+
+    Memory is dense, so one lane touching a high address would widen every lane to it.
+    The matrix stays within `max_cells` cells in total instead: more lanes than fit the
+    program raise a ValueError (split them over several machines), and a lane that
+    reaches past the width is finished by an IntCodeMachine (sparse, paged memory),
+    and only its cells inside the width are copied back.
+
+    Values wrap at 64 bits, so confirm anything that depends on bigger values with an
+    IntCodeMachine.  A lane finished by an IntCodeMachine computes exactly and wraps
+    what it copies back, so a program gives the same outputs however many lanes run
+    it unless a value past 64 bits decides a branch or an address.
+    """
+
+    def __init__(
+        self, instructions: Sequence[int], lanes: int, scalar_below: int = 8, max_cells: int = MAX_CELLS
+    ):
+        if lanes * len(instructions) > max_cells:
+            raise ValueError(
+                f"Expected at most {max_cells // len(instructions)} lanes of this program, but got {lanes}"
+            )
+        self.lanes = lanes
+        self.scalar_below = scalar_below
+        self.memory = np.tile(wrap(instructions), (lanes, 1))
+        # the widest the (lanes, cells) matrix may grow
+        self.width_limit = max(self.memory.shape[1], max_cells // lanes)
+        self.pointer = np.zeros(lanes, dtype=np.int64)
+        self.relative_base = np.zeros(lanes, dtype=np.int64)
+        self.running = np.ones(lanes, dtype=bool)
+
+        # inputs[lane, read[lane]] is the next value opcode 3 takes
+        self.inputs = np.zeros((lanes, 0), dtype=np.int64)
+        self.read = np.zeros(lanes, dtype=np.int64)
+        # outputs[lane, :written[lane]] is everything the lane has written
+        self.outputs = np.zeros((lanes, 0), dtype=np.int64)
+        self.written = np.zeros(lanes, dtype=np.int64)
+
+    def feed(self, values) -> "LaneMachine":
+        """Queue a (lanes, n) block of inputs: row i goes to lane i."""
+        values = np.asarray(values, dtype=np.int64).reshape(self.lanes, -1)
+        self.inputs = np.hstack([self.inputs, values])
+        return self
+
+    def addresses(self, rows: np.ndarray, addresses: np.ndarray) -> np.ndarray:
+        """
+        Checks lane addresses, growing memory so every one of them exists.  Lanes with
+        an address past width_limit raise TooWide before anything is changed.
+        """
+        if (addresses < 0).any():
+            raise RuntimeError(f"Expected the positions to be zero or greater, but got {addresses.min()}!")
+        wide = addresses >= self.width_limit
+        if wide.any():
+            raise TooWide(rows[wide])
+        self.grow(int(addresses.max()) + 1)
+        return addresses
+
+    def grow(self, cells: int) -> None:
+        if cells > self.memory.shape[1]:
+            self.memory = np.pad(self.memory, ((0, 0), (0, cells - self.memory.shape[1])))
+
+    def get_values(self, rows: np.ndarray, position: int, mode: int) -> np.ndarray:
+        raw = self.memory[rows, position]
+        if mode == 1:
+            return raw
+        if mode == 2:
+            raw = raw + self.relative_base[rows]
+        # addresses may grow memory, so it has to run before memory is looked up
+        addresses = self.addresses(rows, raw)
+        return self.memory[rows, addresses]
+
+    def set_values(self, rows: np.ndarray, position: int, mode: int) -> np.ndarray:
+        raw = self.memory[rows, position]
+        if mode == 2:
+            raw = raw + self.relative_base[rows]
+        return self.addresses(rows, raw)
+
+    def run(self) -> None:
+        """Runs every lane to its halt; a lane that runs out of input raises."""
+        while True:
+            active = np.flatnonzero(self.running)
+            if not len(active):
+                return
+
+            pointers = self.pointer[active]
+            if len(active) >= self.scalar_below and (pointers == pointers[0]).all():
+                self.step(active, int(pointers[0]))
+                continue
+
+            for pointer in np.unique(pointers):
+                rows = active[pointers == pointer]
+                if len(rows) < self.scalar_below:
+                    for row in rows:
+                        self.run_scalar(int(row))
+                else:
+                    self.step(rows, int(pointer))
+
+    def step(self, rows: np.ndarray, pointer: int) -> None:
+        """Executes the instruction at `pointer` for the lanes in `rows`."""
+        if pointer + 4 > self.width_limit:
+            for row in rows:
+                self.run_scalar(int(row))
+            return
+
+        self.grow(pointer + 4)
+        values = self.memory[rows, pointer]
+        if (values != values[0]).any():
+            # lanes that rewrote this instruction differently
+            for value in np.unique(values):
+                self.execute_within(rows[values == value], pointer, int(value))
+        else:
+            self.execute_within(rows, pointer, int(values[0]))
+
+    def execute_within(self, rows: np.ndarray, pointer: int, value: int) -> None:
+        """execute, handing the lanes whose addresses are too wide to run_scalar."""
+        while len(rows):
+            try:
+                self.execute(rows, pointer, value)
+                return
+            except TooWide as wide:
+                # every operand is read before anything is written, so nothing changed
+                for row in wide.rows:
+                    self.run_scalar(int(row))
+                rows = rows[~np.isin(rows, wide.rows)]
+
+    def execute(self, rows: np.ndarray, pointer: int, value: int) -> None:
+        op, modes = IntCodeMachine.decode(value)
+
+        if op in (1, 2, 7, 8):
+            value_a = self.get_values(rows, pointer + 1, modes[0])
+            value_b = self.get_values(rows, pointer + 2, modes[1])
+            target = self.set_values(rows, pointer + 3, modes[2])
+            if op == 1:
+                result = value_a + value_b
+            elif op == 2:
+                result = value_a * value_b
+            elif op == 7:
+                result = (value_a < value_b).astype(np.int64)
+            else:
+                result = (value_a == value_b).astype(np.int64)
+            self.memory[rows, target] = result
+            self.pointer[rows] = pointer + 4
+
+        elif op == 3:
+            read = self.read[rows]
+            if (read >= self.inputs.shape[1]).any():
+                raise RuntimeError(f"Expected input for every lane at {pointer}, but some ran out")
+            target = self.set_values(rows, pointer + 1, modes[0])
+            self.memory[rows, target] = self.inputs[rows, read]
+            self.read[rows] = read + 1
+            self.pointer[rows] = pointer + 2
+
+        elif op == 4:
+            self.write_outputs(rows, self.get_values(rows, pointer + 1, modes[0]))
+            self.pointer[rows] = pointer + 2
+
+        elif op == 5 or op == 6:
+            value_a = self.get_values(rows, pointer + 1, modes[0])
+            value_b = self.get_values(rows, pointer + 2, modes[1])
+            taken = value_a != 0 if op == 5 else value_a == 0
+            self.pointer[rows] = np.where(taken, value_b, pointer + 3)
+
+        elif op == 9:
+            self.relative_base[rows] += self.get_values(rows, pointer + 1, modes[0])
+            self.pointer[rows] = pointer + 2
+
+        elif op == 99:
+            self.running[rows] = False
+
+        else:
+            raise RuntimeError(f"Expected, 1-9 or 99, but received {op} at {pointer}")
+
+    def reserve_outputs(self, columns: int) -> None:
+        if columns > self.outputs.shape[1]:
+            self.outputs = np.pad(self.outputs, ((0, 0), (0, columns - self.outputs.shape[1])))
+
+    def write_outputs(self, rows: np.ndarray, values: np.ndarray) -> None:
+        written = self.written[rows]
+        self.reserve_outputs(int(written.max()) + 1)
+        self.outputs[rows, written] = values
+        self.written[rows] = written + 1
+
+    def run_scalar(self, row: int) -> None:
+        """Finishes one lane on an IntCodeMachine and copies its state back."""
+        m = IntCodeMachine(self.memory[row].tolist(), silent=True, policy=Policy.RUN_TO_HALT)
+        m.pointer = int(self.pointer[row])
+        m.relative_base = int(self.relative_base[row])
+        m.feed(self.inputs[row, self.read[row] :].tolist())
+
+        outputs = m.run_until(on_input_starved=False)
+        start = int(self.written[row])
+        self.reserve_outputs(start + len(outputs))
+        self.outputs[row, start : start + len(outputs)] = wrap(outputs)
+        self.written[row] = start + len(outputs)
+
+        # copied back only as far as the matrix is wide
+        width = min(len(m.memory), self.memory.shape[1])
+        self.memory[row, :width] = wrap(m.memory.read(position) for position in range(width))
+        self.pointer[row] = m.pointer
+        self.relative_base[row] = m.relative_base
+        self.read[row] = self.inputs.shape[1] - len(m.inputs)
+        self.running[row] = False
@@ -0,0 +1,626 @@
+import copy
+import time
+from collections import deque
+from enum import Flag
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from intcode import checkpoint
+from intcode.channel import InputChannel
+from intcode.compiler import BlockCompiler
+from intcode.memory import PAGE_BITS, PAGE_MASK, ZERO_PAGE, PagedMemory
+from intcode.profiler import NAMES, Profile
+from intcode.snapshot import Snapshot
+
+
+class Policy(Flag):
+    """
+    How op_codes hands control back to the caller.
+
+    - RUN_TO_HALT: outputs only update the buffer; halting returns (99, buffer)
+    - YIELD_ON_OUTPUT: every output returns (4, value); halting returns None
+    - BLOCK_ON_INPUT: an input with nothing queued returns (3, None) and leaves the
+      pointer on the input instruction instead of raising a RuntimeError
+
+    BLOCK_ON_INPUT can be combined with either of the others.
+    """
+
+    RUN_TO_HALT = 0
+    YIELD_ON_OUTPUT = 1
+    BLOCK_ON_INPUT = 2
+
+
+class IntCodeMachine:
+    symb = NAMES
+    telemetry_flag = False
+    telemetry = dict()
+
+    debug_flag = False
+
+    def __init__(
+        self,
+        instructions: Sequence[int],
+        quarters=None,
+        noun=None,
+        verb=None,
+        silent=False,
+        policy: Policy = Policy.YIELD_ON_OUTPUT,
+    ):
+
+        self.pointer = 0
+        self.relative_base = 0
+        self.memory = PagedMemory(instructions)
+
+        # for day_02/day13
+        self.memory[0] = self.memory[0] if quarters is None else quarters
+        self.memory[1] = self.memory[1] if noun is None else noun
+        self.memory[2] = self.memory[2] if verb is None else verb
+
+        # values read by opcode 3; see InputChannel for sources and blocking reads
+        self.inputs = InputChannel()
+        self.buffer = None
+        self.debug_buffer = []
+
+        self.policy = policy
+
+        # silent is used to remove the print (annoying when running all AOC problems).
+        self.silent = silent
+
+        # address -> (opcode, position_modes); see memory_write for invalidation.  After
+        # a fork the dict is shared until either machine changes it (see own_decoded)
+        self.decoded: Dict[int, Tuple[int, Tuple[int, int, int]]] = {}
+        self.shared_decoded = False
+
+        # compiled straight-line blocks used by op_codes_compiled (created on first use)
+        self.compiler: Optional[BlockCompiler] = None
+
+        # Telemetry to help optimization (address -> hits, filled in as addresses execute)
+        # and the full Profile; both are only written by op_codes_profiled
+        self.telemetry = {}
+        self.profile: Optional[Profile] = None
+
+    def save(self, path: str, compress: bool = True) -> None:
+        """Write a binary checkpoint (see intcode.checkpoint) of the complete state."""
+        checkpoint.write(path, self.snapshot(), self.policy.value, self.silent, compress)
+
+    def load(self, path: str) -> None:
+        snapshot, policy, self.silent = checkpoint.read(path)
+        self.policy = Policy(policy)
+        self.restore(snapshot)
+
+    def snapshot(self) -> Snapshot:
+        return Snapshot(
+            memory=self.memory.fork(),
+            pointer=self.pointer,
+            relative_base=self.relative_base,
+            inputs=tuple(self.inputs.queue),
+            buffer=self.buffer,
+            telemetry=dict(self.telemetry),
+        )
+
+    def restore(self, snapshot: Snapshot) -> None:
+        """Rewind to `snapshot`; decodes and compiled blocks survive where the code matches."""
+        self.pointer = snapshot.pointer
+        self.relative_base = snapshot.relative_base
+        self.inputs.queue = deque(snapshot.inputs)
+        self.buffer = snapshot.buffer
+        self.telemetry = dict(snapshot.telemetry)
+        self.replace_memory(snapshot.memory.fork())
+
+    def fork(self) -> "IntCodeMachine":
+        """
+        An independent machine continuing from exactly this state.  Memory pages, the
+        decode cache and the compiled blocks are all shared copy-on-write, so this costs
+        O(pages) for the page table and each cache is only copied once either machine
+        changes it.  An input source iterator stays shared.
+        """
+        child = copy.copy(self)
+        child.memory = self.memory.fork()
+        child.inputs = self.inputs.copy()
+        child.debug_buffer = list(self.debug_buffer)
+        self.shared_decoded = child.shared_decoded = True
+        child.telemetry = dict(self.telemetry)
+        child.profile = None if self.profile is None else self.profile.copy()
+        child.compiler = None if self.compiler is None else self.compiler.fork(child)
+        return child
+
+    def own_decoded(self) -> None:
+        """Take a private copy of a decode cache still shared with a fork."""
+        self.decoded = dict(self.decoded)
+        self.shared_decoded = False
+
+    def replace_memory(self, memory: PagedMemory) -> None:
+        """Swap in a new memory image, keeping every decode and block it did not change."""
+        old = self.memory
+        self.memory = memory
+
+        # pages still shared with the old image cannot hold any changes
+        changed = {
+            number
+            for number in set(old.pages) | set(memory.pages)
+            if old.pages.get(number) is not memory.pages.get(number)
+        }
+
+        stale = [
+            position
+            for position in self.decoded
+            if position >> PAGE_BITS in changed and old.read(position) != memory.read(position)
+        ]
+        if stale and self.shared_decoded:
+            self.own_decoded()
+        for position in stale:
+            del self.decoded[position]
+
+        if self.compiler is not None:
+            for position in list(self.compiler.owners):
+                if position >> PAGE_BITS in changed and old.read(position) != memory.read(position):
+                    self.compiler.invalidate(position)
+            # blocks index their operand pages without a default (see BlockCompiler.scan)
+            missing = set(old.pages) - set(memory.pages)
+            if missing:
+                self.compiler.forget(missing)
+
+    @staticmethod
+    def decode(value: int) -> Tuple[int, Tuple[int, int, int]]:
+        """Split a raw instruction (ABCDE) into its opcode (DE) and modes (C, B, A)."""
+        return value % 100, (value // 100 % 10, value // 1000 % 10, value // 10000 % 10)
+
+    def memory_write(self, position, val):
+        page = self.memory.writable.get(position >> PAGE_BITS)
+        if page is None:
+            self.memory.write(position, val)
+        else:
+            try:
+                page[position & PAGE_MASK] = val
+            except OverflowError:
+                self.memory.write(position, val)
+
+        # self-modifying programs: the cached decode for this address is stale
+        if position in self.decoded:
+            if self.shared_decoded:
+                self.own_decoded()
+            del self.decoded[position]
+        if self.compiler is not None and position in self.compiler.owners:
+            self.compiler.invalidate(position)
+
+    def memory_read(self, position):
+        return self.memory.read(position)
+
+    def input(self, input: int):
+        self.inputs.put(input)
+        return self
+
+    def feed(self, data: Union[bytes, str, Iterable[int]]):
+        """Queue a whole string (as character codes), bytes or iterable of ints at once."""
+        self.inputs.feed(data)
+        return self
+
+    def op_codes(self):
+        """
+        Run until the machine's policy hands control back (see Policy).
+
+        The block compiler is used unless telemetry_flag is set (op_codes_profiled) or
+        debug_flag is set (op_codes_interpreted).  The flags are checked once per call;
+        neither engine the flags select slows down the other two.
+        """
+        if self.telemetry_flag:
+            return self.op_codes_profiled()
+        if self.debug_flag:
+            return self.op_codes_interpreted()
+        return self.op_codes_compiled()
+
+    def run_until(
+        self, outputs: Optional[int] = None, on_input_starved: bool = True, on_halt: bool = True
+    ) -> List[int]:
+        """
+        Batch mode: run and collect every output in one call instead of re-entering
+        op_codes per value, whatever the policy says about yielding.  Stops after
+        `outputs` values (all of them if None), when an input instruction finds nothing
+        queued, or at the halt.
+
+        - on_input_starved=False: running out of input is an error instead of a stop
+        - on_halt=False: halting is an error instead of a stop (e.g. before `outputs`)
+        """
+        collected: List[int] = []
+        if outputs == 0:
+            return collected
+
+        if self.telemetry_flag:
+            results = self.op_codes_profiled(collected, outputs)
+        elif self.debug_flag:
+            results = self.op_codes_interpreted(collected, outputs)
+        else:
+            results = self.op_codes_compiled(collected, outputs)
+
+        op = 99 if results is None else results[0]
+        if op == 3 and not on_input_starved:
+            raise RuntimeError(f"Expected input after {len(collected)} outputs, but none is queued")
+        if op == 99 and not on_halt:
+            raise RuntimeError(
+                f"Expected {outputs or 'more'} outputs, but the machine halted after {len(collected)}"
+            )
+        return collected
+
+    def run_ascii(
+        self, outputs: Optional[int] = None, on_input_starved: bool = True, on_halt: bool = True
+    ) -> str:
+        """
+        run_until decoded as text.  Values outside ASCII (the answers these programs
+        print last) are not characters and are left out; the last one is still in buffer.
+        """
+        values = self.run_until(outputs, on_input_starved, on_halt)
+        return bytes(v for v in values if 0 <= v < 128).decode("ascii")
+
+    @property
+    def halted(self) -> bool:
+        """True once the pointer rests on the halt instruction."""
+        return self.memory_read(self.pointer) % 100 == 99
+
+    def op_codes_interpreted(
+        self, collected: Optional[List[int]] = None, outputs: Optional[int] = None
+    ):
+        """
+        One instruction at a time, with debug output.  Given a `collected`
+        list, outputs are appended to it until there are `outputs` of them (see run_until).
+        """
+        while True:
+            # for debug purposes freeze the starting pointer
+            pointer = self.pointer
+
+            # opcode and position_modes are decoded once per address and reused
+            # until a memory_write lands on that address.
+            decoded = self.decoded.get(pointer)
+            if decoded is None:
+                decoded = self.decode(self.memory_read(pointer))
+                if self.shared_decoded:
+                    self.own_decoded()
+                self.decoded[pointer] = decoded
+                if self.compiler is not None:
+                    self.compiler.watch(pointer)
+            op, position_modes = decoded
+
+            self.pointer += 1
+
+            if op == 1:  # add
+                value_a = self.get_value(position_modes[0])
+                value_b = self.get_value(position_modes[1])
+                value_c = self.set_value(position_modes[2])
+                self.memory_write(value_c, value_a + value_b)
+
+                debug_args = [value_a, value_b, value_c]
+
+            elif op == 2:  # multiplication
+                value_a = self.get_value(position_modes[0])
+                value_b = self.get_value(position_modes[1])
+                value_c = self.set_value(position_modes[2])
+                self.memory_write(value_c, value_a * value_b)
+
+                debug_args = [value_a, value_b, value_c]
+
+            elif op == 3:  # input to param
+                # stay on the input instruction if nothing is queued
+                self.pointer = pointer
+                if self.input_starved(collected is not None):
+                    return op, None
+                self.pointer += 1
+
+                result = self.inputs.get()
+
+                value_c = self.set_value(position_modes[0])
+                self.memory_write(value_c, int(result))
+
+                self.debug_buffer.insert(0, f"\tINPUT VALUE: {result}")
+                debug_args = [value_c]
+
+            elif op == 4:  # output
+                value_a = self.get_value(position_modes[0])
+                self.buffer = value_a
+
+                if not self.silent:
+                    print(">>", self.buffer)
+
+                if collected is not None:
+                    collected.append(value_a)
+                    yielding = len(collected) == outputs
+                else:
+                    yielding = Policy.YIELD_ON_OUTPUT in self.policy
+
+                if yielding:
+                    if self.debug_flag:
+                        self.pprint_debug(pointer, op, [value_a], position_modes)
+                    return op, self.buffer
+
+                debug_args = [value_a]
+
+            elif op == 5:
+                """
+                If not zero, sets the instruction pointer to the value from the second parameter.
+                Otherwise, it does nothing.
+                """
+                value_a = self.get_value(position_modes[0])
+                value_b = self.get_value(position_modes[1])
+                self.pointer = value_b if value_a != 0 else self.pointer
+
+                debug_args = [value_a, value_b]
+
+            elif op == 6:
+                """jump-if-zero: if the first parameter is zero, it sets the instruction pointer to the value
+                from the second parameter. Otherwise, it does nothing."""
+                value_a = self.get_value(position_modes[0])
+                value_b = self.get_value(position_modes[1])
+                self.pointer = value_b if value_a == 0 else self.pointer
+
+                debug_args = [value_a, value_b]
+
+            elif op == 7:
+                """if less than: set next arg to 1 else 0"""
+                value_a = self.get_value(position_modes[0])
+                value_b = self.get_value(position_modes[1])
+                value_c = self.set_value(position_modes[2])
+                self.memory_write(value_c, 1 if value_a < value_b else 0)
+
+                debug_args = [value_a, value_b, value_c]
+
+            elif op == 8:
+                """if equal: set next arg to 1 else 0"""
+                value_a = self.get_value(position_modes[0])
+                value_b = self.get_value(position_modes[1])
+                value_c = self.set_value(position_modes[2])
+
+                val = 1 if value_a == value_b else 0
+
+                self.memory_write(value_c, val)
+                debug_args = [value_a, value_b, value_c]
+
+            elif op == 9:
+                """adjusts the relative base by the value of its only parameter."""
+
+                value_a = self.get_value(position_modes[0])
+
+                self.relative_base += value_a
+
+                debug_args = [value_a]
+
+            elif op == 99:
+                """Halt: Exit Now..."""
+                self.pointer = pointer
+                return self.halt(pointer, position_modes)
+
+            else:
+                self.raise_bad_op(op)
+
+            if self.debug_flag:
+                self.pprint_debug(pointer, op, debug_args, position_modes)
+                while self.debug_buffer:
+                    print(self.debug_buffer.pop())
+
+    def op_codes_compiled(
+        self, collected: Optional[List[int]] = None, outputs: Optional[int] = None
+    ):
+        """
+        Block-level engine with the same contract as op_codes_interpreted.  Straight-line
+        runs are executed as one compiled BlockCompiler function each; only input, output
+        and halt are dispatched one instruction at a time.  Debug output and telemetry are
+        only available through op_codes_interpreted and op_codes_profiled.
+        """
+        if self.compiler is None:
+            self.compiler = BlockCompiler(self)
+            for position in self.decoded:
+                self.compiler.watch(position)
+        compiler = self.compiler
+
+        while True:
+            # not cached in a local: a copy-on-write fork may swap in a new dict
+            block = compiler.blocks.get(self.pointer)
+            if block is not None:
+                self.pointer = block(self)
+                continue
+
+            pointer = self.pointer
+            decoded = self.decoded.get(pointer)
+            if decoded is None:
+                decoded = self.decode(self.memory_read(pointer))
+                if self.shared_decoded:
+                    self.own_decoded()
+                self.decoded[pointer] = decoded
+                if self.compiler is not None:
+                    self.compiler.watch(pointer)
+            op, position_modes = decoded
+
+            if op == 3:
+                if self.input_starved(collected is not None):
+                    return op, None
+
+                result = self.inputs.get()
+                self.pointer += 1
+                self.memory_write(self.set_value(position_modes[0]), int(result))
+
+            elif op == 4:
+                self.pointer += 1
+                self.buffer = self.get_value(position_modes[0])
+
+                if not self.silent:
+                    print(">>", self.buffer)
+
+                if collected is not None:
+                    collected.append(self.buffer)
+                    if len(collected) == outputs:
+                        return op, self.buffer
+                elif Policy.YIELD_ON_OUTPUT in self.policy:
+                    return op, self.buffer
+
+            elif op == 99:
+                return self.halt(pointer, position_modes)
+
+            elif op in BlockCompiler.straight_line or op in BlockCompiler.jumps:
+                self.compiler.compile(pointer)
+
+            else:
+                self.raise_bad_op(op)
+
+    def op_codes_profiled(
+        self, collected: Optional[List[int]] = None, outputs: Optional[int] = None
+    ):
+        """
+        Instrumented engine with the contract of op_codes_interpreted.  Every instruction
+        is counted and timed into self.profile (see Profile) and into telemetry; jumps
+        also count whether they were taken.
+        """
+        if self.profile is None:
+            self.profile = Profile()
+        samples = self.profile.samples
+        branches = self.profile.branches
+        telemetry = self.telemetry
+        clock = time.perf_counter_ns
+
+        while True:
+            pointer = self.pointer
+            decoded = self.decoded.get(pointer)
+            if decoded is None:
+                decoded = self.decode(self.memory_read(pointer))
+                if self.shared_decoded:
+                    self.own_decoded()
+                self.decoded[pointer] = decoded
+                if self.compiler is not None:
+                    self.compiler.watch(pointer)
+            op, position_modes = decoded
+
+            if op == 3 and self.input_starved(collected is not None):
+                return op, None
+
+            start = clock()
+            self.pointer += 1
+            yielding = False
+
+            if op == 1:
+                value_a = self.get_value(position_modes[0])
+                value_b = self.get_value(position_modes[1])
+                self.memory_write(self.set_value(position_modes[2]), value_a + value_b)
+
+            elif op == 2:
+                value_a = self.get_value(position_modes[0])
+                value_b = self.get_value(position_modes[1])
+                self.memory_write(self.set_value(position_modes[2]), value_a * value_b)
+
+            elif op == 3:
+                result = self.inputs.get()
+                self.memory_write(self.set_value(position_modes[0]), int(result))
+
+            elif op == 4:
+                self.buffer = self.get_value(position_modes[0])
+                if not self.silent:
+                    print(">>", self.buffer)
+
+                if collected is not None:
+                    collected.append(self.buffer)
+                    yielding = len(collected) == outputs
+                else:
+                    yielding = Policy.YIELD_ON_OUTPUT in self.policy
+
+            elif op == 5 or op == 6:
+                value_a = self.get_value(position_modes[0])
+                value_b = self.get_value(position_modes[1])
+                taken = (value_a != 0) if op == 5 else (value_a == 0)
+                if taken:
+                    self.pointer = value_b
+                counts = branches.get(pointer)
+                if counts is None:
+                    counts = branches[pointer] = [0, 0]
+                counts[0 if taken else 1] += 1
+
+            elif op == 7:
+                value_a = self.get_value(position_modes[0])
+                value_b = self.get_value(position_modes[1])
+                self.memory_write(self.set_value(position_modes[2]), 1 if value_a < value_b else 0)
+
+            elif op == 8:
+                value_a = self.get_value(position_modes[0])
+                value_b = self.get_value(position_modes[1])
+                self.memory_write(self.set_value(position_modes[2]), 1 if value_a == value_b else 0)
+
+            elif op == 9:
+                self.relative_base += self.get_value(position_modes[0])
+
+            elif op == 99:
+                self.pointer = pointer
+
+            else:
+                self.raise_bad_op(op)
+
+            elapsed = clock() - start
+            sample = samples.get((pointer, op))
+            if sample is None:
+                sample = samples[(pointer, op)] = [0, 0]
+            sample[0] += 1
+            sample[1] += elapsed
+            telemetry[pointer] = telemetry.get(pointer, 0) + 1
+
+            if op == 99:
+                return self.halt(pointer, position_modes)
+            if yielding:
+                return op, self.buffer
+
+    def input_starved(self, collecting: bool = False) -> bool:
+        """True when an input instruction should hand control back instead of reading."""
+        if not self.inputs.starved():
+            return False
+        if collecting or Policy.BLOCK_ON_INPUT in self.policy:
+            return True
+        raise RuntimeError("Expected input from previous amp step...")
+
+    def halt(self, pointer, position_modes):
+        """The pointer stays on the halt instruction, so calling op_codes again halts again."""
+        if self.debug_flag:
+            self.pprint_debug(pointer, 99, [], position_modes)
+            while self.debug_buffer:
+                print(self.debug_buffer.pop())
+
+        if not self.silent:
+            print("Halting!")
+
+        if Policy.YIELD_ON_OUTPUT not in self.policy:
+            return 99, self.buffer
+
+        return None
+
+    def raise_bad_op(self, op):
+        raise RuntimeError(
+            f"Expected, 1-9 or 99, but received {op}\n"
+            f" - current buffer: {self.buffer}\n"
+            f" - current pointer: {self.pointer}\n"
+            f" - memory dump: \n{list(self.memory)}"
+        )
+
+    def set_value(self, position_mode):
+        raw_value = self.get_value(1)
+        if position_mode == 2:
+            return raw_value + self.relative_base
+        return raw_value
+
+    def get_value(self, position_mode):
+        """
+        - Mode 0: reads memory at pointer value
+        - Mode 1: returns the pointer value
+        - Mode 2: reads memory at pointer value + relative_base
+
+        Pages are indexed directly; only negative addresses go through memory_read (to raise).
+        """
+        pages = self.memory.pages
+        pointer = self.pointer
+        self.pointer = pointer + 1
+
+        raw_value = pages.get(pointer >> PAGE_BITS, ZERO_PAGE)[pointer & PAGE_MASK]
+        if position_mode == 1:
+            return raw_value
+
+        if position_mode == 2:
+            raw_value += self.relative_base
+
+        if raw_value < 0:
+            return self.memory_read(raw_value)
+        return pages.get(raw_value >> PAGE_BITS, ZERO_PAGE)[raw_value & PAGE_MASK]
+
+    def pprint_debug(self, pointer, op, args, position_modes):
+        self.debug_buffer.insert(
+            0,
+            f"{self.telemetry.get(pointer, 0):06} | {pointer:04}: [{op:02}]: {self.symb[op]:>13} {tuple(args)} | Modes: {position_modes} | {self.relative_base}",
+        )
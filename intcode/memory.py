@@ -0,0 +1,110 @@
+from array import array
+from typing import Dict, Iterable, Iterator, List, Union
+
+PAGE_BITS = 9
+PAGE_SIZE = 1 << PAGE_BITS
+PAGE_MASK = PAGE_SIZE - 1
+
+Page = Union[array, List[int]]
+
+# shared, never written: what every unmapped page reads as
+ZERO_PAGE = array("q", bytes(8 * PAGE_SIZE))
+
+
+class PagedMemory:
+    """
+    Sparse Intcode memory made of fixed size array('q') pages keyed by page number.
+
+    Reading an address that was never written costs one dict lookup and returns 0;
+    writing allocates only the page it lands on.  A page that has to hold a value
+    outside of 64 bits is converted to a plain list of Python ints.
+
+    fork() shares every page with the new memory copy-on-write: `pages` holds all
+    pages for reading, `writable` only the ones this memory owns outright, and the
+    first write to any other page copies it.  The engines index both directly on their
+    hot paths and fall back to write() on a KeyError:
+
+        pages.get(position >> PAGE_BITS, ZERO_PAGE)[position & PAGE_MASK]
+        writable[position >> PAGE_BITS][position & PAGE_MASK] = value
+    """
+
+    def __init__(self, values: Iterable[int] = ()):
+        self.pages: Dict[int, Page] = {}
+        self.writable: Dict[int, Page] = {}
+
+        values = list(values)
+        try:
+            cells: Page = array("q", values)
+        except OverflowError:
+            cells = values
+
+        for start in range(0, len(cells), PAGE_SIZE):
+            page = cells[start : start + PAGE_SIZE]
+            page.extend(ZERO_PAGE[: PAGE_SIZE - len(page)])
+            if isinstance(page, list):
+                # only the pages that really hold a big value stay as Python ints
+                try:
+                    page = array("q", page)
+                except OverflowError:
+                    pass
+            self.pages[start >> PAGE_BITS] = self.writable[start >> PAGE_BITS] = page
+
+    def read(self, position: int) -> int:
+        if position < 0:
+            raise RuntimeError(
+                f"Expected the position to be zero or greater, but got {position}!"
+            )
+        return self.pages.get(position >> PAGE_BITS, ZERO_PAGE)[position & PAGE_MASK]
+
+    def write(self, position: int, value: int) -> None:
+        if position < 0:
+            raise RuntimeError(
+                f"Expected the position to be zero or greater, but got {position}!"
+            )
+        number = position >> PAGE_BITS
+        page = self.writable.get(number)
+        if page is None:
+            page = self.own(number)
+        try:
+            page[position & PAGE_MASK] = value
+        except OverflowError:
+            page = self.pages[number] = self.writable[number] = page.tolist()
+            page[position & PAGE_MASK] = value
+
+    def own(self, number: int) -> Page:
+        """Make page `number` writable: allocate it, or copy it if it is shared."""
+        page = self.pages.get(number)
+        page = array("q", bytes(8 * PAGE_SIZE)) if page is None else page[:]
+        self.pages[number] = self.writable[number] = page
+        return page
+
+    def page(self, number: int) -> Page:
+        """The page with this number for reading, allocated if it was never written."""
+        page = self.pages.get(number)
+        if page is None:
+            page = self.own(number)
+        return page
+
+    def fork(self) -> "PagedMemory":
+        """A copy in O(pages): both sides keep the same page objects until they write."""
+        child = PagedMemory()
+        child.pages = dict(self.pages)
+        self.writable.clear()
+        return child
+
+    def __getitem__(self, position: int) -> int:
+        return self.read(position)
+
+    def __setitem__(self, position: int, value: int) -> None:
+        self.write(position, value)
+
+    def __len__(self) -> int:
+        """One past the last address of the highest allocated page."""
+        return (max(self.pages) + 1) << PAGE_BITS if self.pages else 0
+
+    def __iter__(self) -> Iterator[int]:
+        for position in range(len(self)):
+            yield self.read(position)
+
+    def __repr__(self) -> str:
+        return f"PagedMemory(pages={sorted(self.pages)}, writable={sorted(self.writable)})"
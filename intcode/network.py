@@ -0,0 +1,99 @@
+import time
+from collections import deque
+from typing import Deque, Dict, List, Tuple, Union
+
+from intcode.machine import IntCodeMachine
+
+Packet = Tuple[int, int, int]
+
+
+class Network:
+    """
+    Cooperative scheduler for Intcode machines that talk in (address, x, y) packets.
+
+    A machine's InputChannel is its packet queue, and `runnable` is the ready queue of
+    machine addresses.  A machine is scheduled when a packet arrives for it.  Without
+    packets it is polled with -1 for at most `idle_quantum` runs in a row that produce
+    nothing; after that it is parked until the next packet arrives.  The network is
+    idle once nothing is runnable: every queue is empty and every machine is parked.
+
+    Packets to an address outside of the network (e.g. 255 for the NAT) are returned by
+    run_until_idle instead of being delivered.  `machines` is a list indexed by address
+    or a dict of them.  ShardedNetwork replays this same schedule over worker processes.
+    """
+
+    def __init__(
+        self,
+        machines: Union[List[IntCodeMachine], Dict[int, IntCodeMachine]],
+        idle_quantum: int = 2,
+    ):
+        self.machines = machines if isinstance(machines, dict) else dict(enumerate(machines))
+        self.idle_quantum = idle_quantum
+
+        self.runnable: Deque[int] = deque(self.machines)
+        self.scheduled = set(self.machines)
+        self.polls = dict.fromkeys(self.machines, 0)
+        self.partial: Dict[int, List[int]] = {address: [] for address in self.machines}
+
+        # metrics
+        self.packets = 0
+        self.runs = 0
+        self.elapsed = 0.0
+
+    @property
+    def idle(self) -> bool:
+        return not self.runnable
+
+    @property
+    def throughput(self) -> float:
+        """Packets routed per second of scheduling."""
+        return self.packets / self.elapsed if self.elapsed else 0.0
+
+    def send(self, address: int, x: int, y: int) -> None:
+        self.machines[address].feed((x, y))
+        self.polls[address] = 0
+        if address not in self.scheduled:
+            self.scheduled.add(address)
+            self.runnable.append(address)
+
+    def step(self, address: int) -> List[Packet]:
+        """Run one machine until it wants input it does not have; route what it sent."""
+        m = self.machines[address]
+        fed = bool(m.inputs)
+        if not fed:
+            m.input(-1)
+
+        values = self.partial[address] + m.run_until()
+        cut = len(values) - len(values) % 3
+        self.partial[address] = values[cut:]
+        self.runs += 1
+
+        external = []
+        for i in range(0, cut, 3):
+            destination, x, y = values[i : i + 3]
+            self.packets += 1
+            if destination in self.machines:
+                self.send(destination, x, y)
+            else:
+                external.append((destination, x, y))
+
+        if fed or cut:
+            self.polls[address] = 0
+        else:
+            self.polls[address] += 1
+
+        if not m.halted and self.polls[address] < self.idle_quantum and address not in self.scheduled:
+            self.scheduled.add(address)
+            self.runnable.append(address)
+        return external
+
+    def run_until_idle(self) -> List[Packet]:
+        """Run machines in ready order until the network is idle; the packets that left it."""
+        start = time.perf_counter()
+        external = []
+        while self.runnable:
+            address = self.runnable.popleft()
+            self.scheduled.discard(address)
+            external.extend(self.step(address))
+        self.elapsed += time.perf_counter() - start
+        return external
@@ -0,0 +1,108 @@
+"""
+Counters for IntCodeMachine.op_codes_profiled, the instrumented engine selected by
+telemetry_flag.  The other engines never look at any of this.
+
+A Profile reports per address hits, per opcode counts, time per opcode family and the
+taken/not-taken counts of every jump, either as JSON or as folded stacks
+("intcode;family;op@address nanoseconds" lines) for flamegraph.pl and friends.
+"""
+
+import json
+from typing import Dict, List, Tuple
+
+NAMES = {
+    1: "add",
+    2: "mul",
+    3: "input",
+    4: "output",
+    5: "jump_if_!zero",
+    6: "jump_if_zero",
+    7: "if_less_than",
+    8: "if_equal",
+    9: "set_relative",
+    99: "halt",
+}
+
+FAMILIES = {
+    1: "arithmetic",
+    2: "arithmetic",
+    3: "io",
+    4: "io",
+    5: "jump",
+    6: "jump",
+    7: "compare",
+    8: "compare",
+    9: "relative_base",
+    99: "halt",
+}
+
+
+class Profile:
+    def __init__(self) -> None:
+        # (address, opcode) -> [hits, nanoseconds]; an address can run several opcodes
+        # when the program rewrites itself
+        self.samples: Dict[Tuple[int, int], List[int]] = {}
+        # jump address -> [taken, not taken]
+        self.branches: Dict[int, List[int]] = {}
+
+    def copy(self) -> "Profile":
+        profile = Profile()
+        profile.samples = {key: list(sample) for key, sample in self.samples.items()}
+        profile.branches = {key: list(counts) for key, counts in self.branches.items()}
+        return profile
+
+    @property
+    def instructions(self) -> int:
+        return sum(hits for hits, _ in self.samples.values())
+
+    def hits(self) -> Dict[int, int]:
+        result: Dict[int, int] = {}
+        for (address, _), (hits, _) in sorted(self.samples.items()):
+            result[address] = result.get(address, 0) + hits
+        return result
+
+    def opcodes(self) -> Dict[str, int]:
+        result: Dict[str, int] = {}
+        for (_, op), (hits, _) in self.samples.items():
+            result[NAMES[op]] = result.get(NAMES[op], 0) + hits
+        return result
+
+    def families(self) -> Dict[str, Dict[str, float]]:
+        result: Dict[str, Dict[str, float]] = {}
+        for (_, op), (hits, nanoseconds) in self.samples.items():
+            family = result.setdefault(FAMILIES[op], {"count": 0, "seconds": 0.0})
+            family["count"] += hits
+            family["seconds"] += nanoseconds / 1e9
+        return result
+
+    def branch_ratios(self) -> Dict[int, Dict[str, float]]:
+        return {
+            address: {"taken": taken, "not_taken": not_taken, "ratio": taken / (taken + not_taken)}
+            for address, (taken, not_taken) in sorted(self.branches.items())
+        }
+
+    def report(self) -> Dict:
+        """Everything above in one JSON-ready dict (addresses become string keys)."""
+        return {
+            "instructions": self.instructions,
+            "opcodes": self.opcodes(),
+            "families": self.families(),
+            "hits": {str(k): v for k, v in self.hits().items()},
+            "branches": {str(k): v for k, v in self.branch_ratios().items()},
+        }
+
+    def folded(self) -> List[str]:
+        return [
+            f"intcode;{FAMILIES[op]};{NAMES[op]}@{address} {nanoseconds}"
+            for (address, op), (_, nanoseconds) in sorted(self.samples.items())
+        ]
+
+    def write(self, path: str, format: str = "json") -> None:
+        """format is "json" or "folded"."""
+        with open(path, "w") as file:
+            if format == "json":
+                json.dump(self.report(), file, indent=2)
+            elif format == "folded":
+                file.write("\n".join(self.folded()) + "\n")
+            else:
+                raise ValueError(f"Expected format 'json' or 'folded', but got {format!r}")
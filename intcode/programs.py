@@ -0,0 +1,77 @@
+"""
+Loading Intcode programs.
+
+parse_instructions keeps every program it has loaded for the life of the process,
+keyed by path and checked against the file's mtime, and hands out the same immutable
+tuple each time.  On a cold start it reads a packed copy written beside the text file
+("<path>.icp": a header with the source's mtime and size, then one checkpoint int
+section) and only parses text when that copy is missing or stale.
+"""
+
+import os
+import struct
+from typing import Dict, Tuple
+
+import helpers
+from intcode.checkpoint import pack_ints, unpack_ints
+
+MAGIC = b"ICPG"
+VERSION = 1
+HEADER = struct.Struct("<4sHqq")
+SUFFIX = ".icp"
+
+Program = Tuple[int, ...]
+
+# path -> (mtime_ns, program)
+programs: Dict[str, Tuple[int, Program]] = {}
+
+
+def parse_instructions(path: str) -> Program:
+    stat = os.stat(path)
+    key = os.path.abspath(path)
+    cached = programs.get(key)
+    if cached is not None and cached[0] == stat.st_mtime_ns:
+        return cached[1]
+
+    program = read_packed(path + SUFFIX, stat)
+    if program is None:
+        program = parse_text(path)
+        write_packed(path + SUFFIX, stat, program)
+
+    programs[key] = stat.st_mtime_ns, program
+    return program
+
+
+def parse_text(path: str) -> Program:
+    lines = helpers.get_lines(path)
+    return tuple(int(v) for v in lines[0].split(","))
+
+
+def read_packed(path: str, source: os.stat_result):
+    """The program in a packed copy made from exactly this source, else None."""
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+    except OSError:
+        return None
+
+    if len(data) < HEADER.size:
+        return None
+    magic, version, mtime_ns, size = HEADER.unpack_from(data)
+    if (magic, version, mtime_ns, size) != (MAGIC, VERSION, source.st_mtime_ns, source.st_size):
+        return None
+    values, _ = unpack_ints(data, HEADER.size)
+    return tuple(values)
+
+
+def write_packed(path: str, source: os.stat_result, program: Program) -> None:
+    data = HEADER.pack(MAGIC, VERSION, source.st_mtime_ns, source.st_size) + pack_ints(program)
+    # written aside and renamed, so days running in parallel never read half a file
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as file:
+            file.write(data)
+        os.replace(temporary, path)
+    except OSError:
+        # a read-only data directory only costs the text parse next time
+        pass
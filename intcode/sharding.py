@@ -0,0 +1,304 @@
+"""
+Run one packet Network across worker processes.
+
+The machines are split round robin over the workers, but the coordinator keeps
+Network's whole schedule (ready queue, polls, partial packets and undelivered packets)
+and replays it step for step, so the same packets reach the caller in the same order
+as with a single Network.  Work proceeds in waves:
+
+    coordinator  takes every runnable machine and sends each shard the steps for its
+                 machines with the packets queued for them so far
+    workers      fork each machine as a backup, run the steps, answer with the outputs
+    coordinator  walks the wave in ready order exactly like Network.run_until_idle
+
+A step is only a guess when it ran: a machine earlier in the same wave may send it a
+packet before its turn.  When that happens the coordinator has that one worker
+restore the backup and run the step again with every packet, before going on.
+
+Frames are int64 runs in SharedMemory rings: the length, then the values.  An inbox
+frame is steps of (address, redo, count, packet values...); an outbox frame is results
+of (address, fed, halted, count, outputs...).
+"""
+
+import multiprocessing
+import time
+from array import array
+from collections import deque
+from multiprocessing.shared_memory import SharedMemory
+from typing import Deque, Dict, List, Optional, Tuple
+
+from intcode import checkpoint
+from intcode.machine import IntCodeMachine
+from intcode.network import Packet
+
+STOP = -1
+
+
+class Ring:
+    """A single producer, single consumer ring of int64 frames in shared memory."""
+
+    def __init__(self, capacity: int = 1 << 16, name: Optional[str] = None):
+        self.capacity = capacity
+        self.owner = name is None
+        # head and tail (counted in cells, never wrapped) ahead of the cells
+        self.shm = SharedMemory(name=name, create=self.owner, size=8 * (capacity + 2))
+        self.cells = self.shm.buf.cast("q")
+        if self.owner:
+            self.cells[0] = self.cells[1] = 0
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def write(self, values: List[int], length: Optional[int] = None) -> None:
+        head, tail = self.cells[0], self.cells[1]
+        if len(values) + 1 > self.capacity - (tail - head):
+            raise ValueError(
+                f"Expected a frame of at most {self.capacity - (tail - head) - 1} values, "
+                f"but got {len(values)}; use a bigger ring capacity"
+            )
+        frame = array("q", [len(values) if length is None else length])
+        frame.extend(values)
+
+        start = tail % self.capacity
+        split = min(len(frame), self.capacity - start)
+        self.cells[2 + start : 2 + start + split] = frame[:split]
+        self.cells[2 : 2 + len(frame) - split] = frame[split:]
+        self.cells[1] = tail + len(frame)
+
+    def read(self) -> Optional[List[int]]:
+        """The next frame's values, or None for a STOP frame."""
+        head = self.cells[0]
+        length = self.cells[2 + head % self.capacity]
+        if length == STOP:
+            self.cells[0] = head + 1
+            return None
+
+        start = (head + 1) % self.capacity
+        split = min(length, self.capacity - start)
+        values = self.cells[2 + start : 2 + start + split].tolist()
+        values.extend(self.cells[2 : 2 + length - split].tolist())
+        self.cells[0] = head + 1 + length
+        return values
+
+    def stop(self) -> None:
+        self.write([], length=STOP)
+
+    def close(self) -> None:
+        self.cells.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def serve(snapshots: Dict[int, bytes], inbox: str, outbox: str, go, done) -> None:
+    """A worker: restore its machines from checkpoints, then answer one frame at a time."""
+    machines = {}
+    for address, data in snapshots.items():
+        machines[address] = m = IntCodeMachine([], silent=True)
+        m.restore(checkpoint.loads(data)[0])
+    backups: Dict[int, IntCodeMachine] = {}
+
+    inbox_ring, outbox_ring = Ring(name=inbox), Ring(name=outbox)
+    try:
+        while True:
+            go.acquire()
+            values = inbox_ring.read()
+            if values is None:
+                break
+
+            results: List[int] = []
+            i = 0
+            while i < len(values):
+                address, redo, count = values[i : i + 3]
+                packets = values[i + 3 : i + 3 + count]
+                i += 3 + count
+
+                if redo:
+                    machines[address] = backups[address].fork()
+                else:
+                    backups[address] = machines[address].fork()
+                m = machines[address]
+
+                # Network.step, with the routing left to the coordinator
+                m.feed(packets)
+                fed = bool(m.inputs)
+                if not fed:
+                    m.input(-1)
+                outputs = m.run_until()
+                results.extend((address, int(fed), int(m.halted), len(outputs), *outputs))
+
+            outbox_ring.write(results)
+            done.release()
+    finally:
+        inbox_ring.close()
+        outbox_ring.close()
+
+
+class ShardedNetwork:
+    """
+    A Network split over `workers` processes with the same send/run_until_idle/metrics
+    interface and the same packets in the same order.  Use it as a context manager (or
+    call close) to stop the workers and free the shared memory.
+    """
+
+    def __init__(
+        self,
+        machines: List[IntCodeMachine],
+        workers: int,
+        idle_quantum: int = 2,
+        capacity: int = 1 << 16,
+    ):
+        self.size = len(machines)
+        self.workers = workers = max(1, min(workers, self.size))
+        self.idle_quantum = idle_quantum
+
+        # Network's scheduling state; queued holds the packets not yet delivered
+        self.runnable: Deque[int] = deque(range(self.size))
+        self.scheduled = set(range(self.size))
+        self.polls = [0] * self.size
+        self.partial: List[List[int]] = [[] for _ in range(self.size)]
+        self.queued: List[List[int]] = [[] for _ in range(self.size)]
+
+        self.inboxes = [Ring(capacity) for _ in range(workers)]
+        self.outboxes = [Ring(capacity) for _ in range(workers)]
+        self.go = [multiprocessing.Semaphore(0) for _ in range(workers)]
+        self.done = [multiprocessing.Semaphore(0) for _ in range(workers)]
+
+        self.processes = []
+        for shard in range(workers):
+            snapshots = {
+                address: checkpoint.dumps(m.snapshot(), m.policy.value, True)
+                for address, m in enumerate(machines)
+                if address % workers == shard
+            }
+            process = multiprocessing.Process(
+                target=serve,
+                args=(
+                    snapshots,
+                    self.inboxes[shard].name,
+                    self.outboxes[shard].name,
+                    self.go[shard],
+                    self.done[shard],
+                ),
+                daemon=True,
+            )
+            process.start()
+            self.processes.append(process)
+
+        # metrics
+        self.packets = 0
+        self.runs = 0
+        self.waves = 0
+        self.redos = 0
+        self.elapsed = 0.0
+
+    @property
+    def throughput(self) -> float:
+        return self.packets / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def idle(self) -> bool:
+        return not self.runnable
+
+    def send(self, address: int, x: int, y: int) -> None:
+        self.queued[address].extend((x, y))
+        self.polls[address] = 0
+        if address not in self.scheduled:
+            self.scheduled.add(address)
+            self.runnable.append(address)
+
+    def run_until_idle(self) -> List[Packet]:
+        """Run machines in ready order until the network is idle; the packets that left it."""
+        start = time.perf_counter()
+        external = []
+        while self.runnable:
+            wave = list(self.runnable)
+            self.runnable.clear()
+            guesses = self.dispatch([(address, 0, list(self.queued[address])) for address in wave])
+            self.waves += 1
+
+            for address in wave:
+                self.scheduled.discard(address)
+                packets, self.queued[address] = self.queued[address], []
+                result = guesses[address]
+                if len(packets) != result[0]:
+                    # an earlier machine in this wave sent it more since the guess
+                    result = self.dispatch([(address, 1, packets)])[address]
+                    self.redos += 1
+                external.extend(self.step(address, *result[1:]))
+        self.elapsed += time.perf_counter() - start
+        return external
+
+    def dispatch(self, steps: List[Tuple[int, int, List[int]]]) -> Dict[int, Tuple[int, bool, bool, List[int]]]:
+        """Run (address, redo, packets) steps on their shards; address -> (packets, fed, halted, outputs)."""
+        frames: List[List[int]] = [[] for _ in range(self.workers)]
+        delivered = {}
+        for address, redo, packets in steps:
+            frames[address % self.workers].extend((address, redo, len(packets), *packets))
+            delivered[address] = len(packets)
+
+        busy = [shard for shard in range(self.workers) if frames[shard]]
+        for shard in busy:
+            self.inboxes[shard].write(frames[shard])
+            self.go[shard].release()
+
+        results = {}
+        for shard in busy:
+            self.wait(shard)
+            values = self.outboxes[shard].read()
+            i = 0
+            while i < len(values):
+                address, fed, halted, count = values[i : i + 4]
+                results[address] = delivered[address], bool(fed), bool(halted), values[i + 4 : i + 4 + count]
+                i += 4 + count
+        return results
+
+    def step(self, address: int, fed: bool, halted: bool, outputs: List[int]) -> List[Packet]:
+        """Network.step's bookkeeping for a step a worker has run."""
+        values = self.partial[address] + outputs
+        cut = len(values) - len(values) % 3
+        self.partial[address] = values[cut:]
+        self.runs += 1
+
+        external = []
+        for i in range(0, cut, 3):
+            destination, x, y = values[i : i + 3]
+            self.packets += 1
+            if 0 <= destination < self.size:
+                self.send(destination, x, y)
+            else:
+                external.append((destination, x, y))
+
+        if fed or cut:
+            self.polls[address] = 0
+        else:
+            self.polls[address] += 1
+
+        if not halted and self.polls[address] < self.idle_quantum and address not in self.scheduled:
+            self.scheduled.add(address)
+            self.runnable.append(address)
+        return external
+
+    def wait(self, shard: int) -> None:
+        while not self.done[shard].acquire(timeout=1):
+            process = self.processes[shard]
+            if not process.is_alive():
+                raise RuntimeError(
+                    f"Expected shard {shard} to answer, but its worker exited with {process.exitcode}"
+                )
+
+    def close(self) -> None:
+        for shard, process in enumerate(self.processes):
+            if process.is_alive():
+                self.inboxes[shard].stop()
+                self.go[shard].release()
+            process.join()
+        for ring in self.inboxes + self.outboxes:
+            ring.close()
+
+    def __enter__(self) -> "ShardedNetwork":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
@@ -0,0 +1,14 @@
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from intcode.memory import PagedMemory
+
+
+class Snapshot(NamedTuple):
+    """Everything needed to resume a machine; the memory is a copy-on-write fork."""
+
+    memory: PagedMemory
+    pointer: int
+    relative_base: int
+    inputs: Tuple[int, ...]
+    buffer: Optional[int]
+    telemetry: Dict[int, int]